@@ -1,36 +1,115 @@
-import os, json, io, pypdf, gc, glob, hashlib, imaplib, email, re
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
+import os, json, hashlib, re, fcntl
 from datetime import datetime
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from email.header import decode_header
-from flask import Flask, render_template, request, jsonify, redirect, send_from_directory
-from openai import OpenAI
+from types import SimpleNamespace
+from flask import Blueprint, Flask, current_app, render_template, request, jsonify, redirect, send_from_directory, send_file
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
+from extraction import CVExtractor, TextCache, extraction_record, STATUS_OK, PERMANENT_FAILURES
+from catalogue import Catalogue
+from storage import CVStore, ScoreCache
+from near_duplicates import PersonIndex
+from prescreen import prescreen, rejection_reason, hints, compact_text, PRESCREEN_VERSION
 
-load_dotenv()
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = '/var/www/talentscope/uploaded_cvs'
-app.config['SESSION_FILE'] = '/var/www/talentscope/data/session_data.json'
-app.config['LOGS_FILE'] = '/var/www/talentscope/data/system_logs.json'
+# pypdf, openai, sib_api_v3_sdk, imaplib and email are imported on first use, not at
+# import time: most requests never touch them and every gunicorn worker pays for
+# module-level work on each boot and restart.
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def load_config():
+    """Read settings from the environment (and .env) once per process"""
+    load_dotenv()
+    root = os.getenv("TALENTSCOPE_ROOT", "/var/www/talentscope")
+    data_folder = os.path.join(root, 'data')
+    
+    return {
+        "UPLOAD_FOLDER": os.path.join(root, 'uploaded_cvs'),
+        "DATA_FOLDER": data_folder,
+        "SESSION_FILE": os.path.join(data_folder, 'session_data.json'),
+        "LOGS_FILE": os.path.join(data_folder, 'system_logs.json'),
+        "CATALOGUE_FILE": os.path.join(data_folder, 'cv_catalogue.bin'),
+        "ALIAS_FILE": os.path.join(data_folder, 'cv_aliases.json'),
+        "TEXT_CACHE_FOLDER": os.path.join(data_folder, 'cv_text'),
+        "SCORE_CACHE_FOLDER": os.path.join(data_folder, 'scores'),
+        "PEOPLE_INDEX_FILE": os.path.join(data_folder, 'cv_people.jsonl'),
+        
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY"),
+        
+        # BREVO EMAIL CONFIGURATION
+        "BREVO_API_KEY": os.getenv("BREVO_API_KEY"),
+        "SENDER_EMAIL": os.getenv("SENDER_EMAIL", "recruitment@talentscope-pilot.pro"),
+        "SENDER_NAME": os.getenv("SENDER_NAME", "Alvin - TalentScope"),
+        
+        # IMAP CONFIGURATION (Updated for PrivateEmail)
+        "IMAP_SERVER": os.getenv("IMAP_SERVER", "mail.privateemail.com"),
+        "IMAP_USER": os.getenv("IMAP_USER", "recruitment@talentscope-pilot.pro"),
+        "IMAP_PASSWORD": os.getenv("IMAP_PASSWORD", ""),
+        
+        # CV EXTRACTION LIMITS (per file, enforced in isolated subprocesses)
+        "EXTRACT_WORKERS": int(os.getenv("EXTRACT_WORKERS", "1")),
+        "EXTRACT_TIMEOUT": int(os.getenv("EXTRACT_TIMEOUT", "30")),
+        "EXTRACT_MAX_PAGES": int(os.getenv("EXTRACT_MAX_PAGES", "20")),
+        "EXTRACT_MAX_RSS_MB": int(os.getenv("EXTRACT_MAX_RSS_MB", "512")),
+        "EXTRACT_TASKS_PER_WORKER": int(os.getenv("EXTRACT_TASKS_PER_WORKER", "25"))
+    }
+
+def build_services(config):
+    """Storage and extraction handles for one app.
+    
+    Cheap handles only - none of these touch the disk or spawn anything until used.
+    """
+    return SimpleNamespace(
+        extractor=CVExtractor(
+            workers=config["EXTRACT_WORKERS"],
+            timeout=config["EXTRACT_TIMEOUT"],
+            max_pages=config["EXTRACT_MAX_PAGES"],
+            max_rss_mb=config["EXTRACT_MAX_RSS_MB"],
+            tasks_per_worker=config["EXTRACT_TASKS_PER_WORKER"]
+        ),
+        # Catalogue of stored CVs (replaces globbing UPLOAD_FOLDER on every request)
+        catalogue=Catalogue(config['CATALOGUE_FILE'], config['UPLOAD_FOLDER']),
+        # Content-addressed CV storage (UPLOAD_FOLDER/ab/cd/<sha256>.pdf)
+        cv_store=CVStore(config['UPLOAD_FOLDER'], config['ALIAS_FILE']),
+        # Extracted CV text, keyed by hash (filled at ingest by the IDLE daemon, or on first analysis)
+        text_cache=TextCache(config['TEXT_CACHE_FOLDER']),
+        # LLM analyses keyed by "<cv_hash>:<jd_hash>", shared by every requisition
+        score_cache=ScoreCache(config['SCORE_CACHE_FOLDER']),
+        # MinHash/LSH index grouping CV versions of the same person
+        person_index=PersonIndex(config['PEOPLE_INDEX_FILE'])
+    )
+
+def services():
+    """Handles of the current app, built by create_app()"""
+    return current_app.extensions["talentscope"]
+
+bp = Blueprint('talentscope', __name__)
+
+@lru_cache(maxsize=None)
+def _openai_client(api_key):
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+def get_openai_client():
+    """OpenAI client, built on first use in each worker"""
+    return _openai_client(current_app.config["OPENAI_API_KEY"])
 
-# BREVO EMAIL CONFIGURATION
-configuration = sib_api_v3_sdk.Configuration()
-configuration.api_key['api-key'] = os.getenv("BREVO_API_KEY")
-SENDER_EMAIL = os.getenv("SENDER_EMAIL", "recruitment@talentscope-pilot.pro")
-SENDER_NAME = os.getenv("SENDER_NAME", "Alvin - TalentScope")
+@lru_cache(maxsize=None)
+def get_brevo_sdk():
+    """The Brevo SDK module, imported on first use"""
+    import sib_api_v3_sdk
+    return sib_api_v3_sdk
 
-# IMAP CONFIGURATION (Updated for PrivateEmail)
-IMAP_SERVER = os.getenv("IMAP_SERVER", "mail.privateemail.com")
-IMAP_USER = os.getenv("IMAP_USER", "recruitment@talentscope-pilot.pro")
-IMAP_PASSWORD = os.getenv("IMAP_PASSWORD", "")
+@lru_cache(maxsize=None)
+def _brevo_api(api_key):
+    sdk = get_brevo_sdk()
+    configuration = sdk.Configuration()
+    configuration.api_key['api-key'] = api_key
+    return sdk.TransactionalEmailsApi(sdk.ApiClient(configuration))
 
-# Create necessary directories
-Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
-Path('/var/www/talentscope/data').mkdir(parents=True, exist_ok=True)
+def get_brevo_api():
+    """Brevo transactional email API, built once per worker instead of per request"""
+    return _brevo_api(current_app.config["BREVO_API_KEY"])
 
 def get_file_hash(file_content):
     """Generate SHA256 hash for robust duplicate detection"""
@@ -38,12 +117,83 @@ def get_file_hash(file_content):
         return hashlib.sha256(file_content).hexdigest()
     return hashlib.sha256(file_content.encode('utf-8')).hexdigest()
 
+def store_cv(data, file_bytes, filename, source, **extra_metadata):
+    """Store a CV by content hash and register it. Returns (path, hash, created)."""
+    f_hash = get_file_hash(file_bytes)
+    
+    # CVs stored before the sharded layout keep their flat path until migrated
+    legacy_path = data.get("hashes", {}).get(f_hash)
+    if legacy_path and os.path.exists(legacy_path):
+        return legacy_path, f_hash, False
+    
+    fpath, created = services().cv_store.put(file_bytes, f_hash)
+    services().cv_store.set_name(f_hash, filename)
+    
+    if "hashes" not in data:
+        data["hashes"] = {}
+    data["hashes"][f_hash] = fpath
+    
+    if created:
+        if "cv_metadata" not in data:
+            data["cv_metadata"] = {}
+        data["cv_metadata"][fpath] = {
+            "original_filename": filename,
+            "upload_date": datetime.now().isoformat(),
+            "hash": f_hash,
+            "source": source,
+            **extra_metadata
+        }
+        
+        if "ingestion_stats" not in data:
+            data["ingestion_stats"] = {"email": 0, "manual": 0}
+        data["ingestion_stats"][source] = data["ingestion_stats"].get(source, 0) + 1
+        services().catalogue.add(f_hash, fpath, len(file_bytes), source)
+    
+    return fpath, f_hash, created
+
+def get_cv_text(data, fpath, f_hash, retry_failed=False):
+    """Extracted text for a CV, from the text cache when possible. None if extraction failed.
+    
+    A file that already failed permanently (malformed, encrypted, empty, over
+    the time or memory limit) is not extracted again unless retry_failed is set.
+    """
+    cv_text = services().text_cache.get(f_hash)
+    if cv_text is not None:
+        return cv_text
+    
+    meta = data.setdefault("cv_metadata", {}).setdefault(fpath, {})
+    previous = meta.get("extraction") or {}
+    if not retry_failed and previous.get("hash") == f_hash and previous.get("status") in PERMANENT_FAILURES:
+        return None
+    
+    extraction = services().extractor.extract(fpath)
+    meta["extraction"] = extraction_record(extraction, f_hash)
+    
+    if extraction["status"] != STATUS_OK:
+        log_system_event("EXTRACTION_FAILED", f"Skipped {os.path.basename(fpath)}", {
+            "status": extraction["status"],
+            "error": extraction["error"]
+        })
+        return None
+    
+    services().text_cache.put(f_hash, extraction["text"])
+    return extraction["text"]
+
+def get_prescreen(data, fpath, cv_text):
+    """Locally extracted compliance fields for a CV, cached in its metadata"""
+    meta = data.setdefault("cv_metadata", {}).setdefault(fpath, {})
+    fields = meta.get("prescreen")
+    if fields is None or fields.get("version") != PRESCREEN_VERSION:
+        fields = prescreen(cv_text)
+        meta["prescreen"] = fields
+    return fields
+
 def log_system_event(event_type, message, details=None):
     """Log system events for audit trail"""
     try:
         logs = []
-        if os.path.exists(app.config['LOGS_FILE']):
-            with open(app.config['LOGS_FILE'], 'r', encoding='utf-8') as f:
+        if os.path.exists(current_app.config['LOGS_FILE']):
+            with open(current_app.config['LOGS_FILE'], 'r', encoding='utf-8') as f:
                 logs = json.load(f)
         
         log_entry = {
@@ -58,16 +208,26 @@ def log_system_event(event_type, message, details=None):
         if len(logs) > 1000:
             logs = logs[-1000:]
         
-        with open(app.config['LOGS_FILE'], 'w', encoding='utf-8') as f:
+        with open(current_app.config['LOGS_FILE'], 'w', encoding='utf-8') as f:
             json.dump(logs, f, indent=2, ensure_ascii=False)
     except Exception as e:
         print(f"Logging error: {e}")
 
+def empty_data():
+    """Fresh session data"""
+    return {
+        "requisitions": {},
+        "active_requisition": None,
+        "hashes": {},
+        "cv_metadata": {},
+        "ingestion_stats": {"email": 0, "manual": 0}
+    }
+
 def load_data():
     """Load session data from JSON file"""
-    if os.path.exists(app.config['SESSION_FILE']):
+    if os.path.exists(current_app.config['SESSION_FILE']):
         try:
-            with open(app.config['SESSION_FILE'], 'r', encoding='utf-8') as f:
+            with open(current_app.config['SESSION_FILE'], 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 if "hashes" not in data:
                     data["hashes"] = {}
@@ -75,20 +235,171 @@ def load_data():
                     data["cv_metadata"] = {}
                 if "ingestion_stats" not in data:
                     data["ingestion_stats"] = {"email": 0, "manual": 0}
-                for candidate in data.get("candidates", []):
-                    if "status" not in candidate:
-                        candidate["status"] = "Applied"
-                    if "notes" not in candidate:
-                        candidate["notes"] = ""
+                if "requisitions" not in data:
+                    data["requisitions"] = {}
+                if "active_requisition" not in data:
+                    data["active_requisition"] = None
+                
+                # Sessions from before requisitions held one global candidate list
+                legacy_candidates = data.pop("candidates", None)
+                if legacy_candidates:
+                    now = datetime.now().isoformat()
+                    data["requisitions"]["req_legacy"] = {
+                        "id": "req_legacy",
+                        "title": "Previous screening",
+                        "jd": "",
+                        "jd_hash": None,
+                        "created_at": now,
+                        "updated_at": now,
+                        "candidates": legacy_candidates
+                    }
+                    data["active_requisition"] = data["active_requisition"] or "req_legacy"
+                
+                hash_by_filename = {os.path.basename(path): f_hash for f_hash, path in data["hashes"].items()}
+                for requisition_id, requisition in data["requisitions"].items():
+                    for candidate in requisition.get("candidates", []):
+                        if "cv_hash" not in candidate and candidate.get("cv_filename") in hash_by_filename:
+                            candidate["cv_hash"] = hash_by_filename[candidate["cv_filename"]]
+                        if "status" not in candidate:
+                            candidate["status"] = "Applied"
+                        if "notes" not in candidate:
+                            candidate["notes"] = ""
+                        if "version" not in candidate:
+                            candidate["version"] = 0
+                        if "requisition_id" not in candidate:
+                            candidate["requisition_id"] = requisition_id
                 return data
         except:
-            return {"candidates": [], "hashes": {}, "cv_metadata": {}, "ingestion_stats": {"email": 0, "manual": 0}}
-    return {"candidates": [], "hashes": {}, "cv_metadata": {}, "ingestion_stats": {"email": 0, "manual": 0}}
+            return empty_data()
+    return empty_data()
+
+def get_jd_hash(jd):
+    """Hash of a JD with whitespace normalised, so reformatting keeps cached scores"""
+    return get_file_hash(" ".join(jd.split()))
+
+def get_requisition(data, requisition_id=None):
+    """Requisition by id, or the active one when no id is given"""
+    requisition_id = requisition_id or data.get("active_requisition")
+    return data.get("requisitions", {}).get(requisition_id)
+
+def requisition_candidates(data, requisition_id=None):
+    """Candidate ranking of a requisition (the active one by default)"""
+    requisition = get_requisition(data, requisition_id)
+    return requisition["candidates"] if requisition else []
+
+def requisition_summary(data, requisition):
+    return {
+        "id": requisition["id"],
+        "title": requisition.get("title", ""),
+        "jd_hash": requisition.get("jd_hash"),
+        "candidate_count": len(requisition.get("candidates", [])),
+        "created_at": requisition.get("created_at"),
+        "updated_at": requisition.get("updated_at"),
+        "active": requisition["id"] == data.get("active_requisition")
+    }
 
 def save_data(data):
-    """Save session data to JSON file"""
-    with open(app.config['SESSION_FILE'], 'w', encoding='utf-8') as f:
+    """Save session data to JSON file (atomic replace, never a half-written file)"""
+    tmp_path = f"{current_app.config['SESSION_FILE']}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, current_app.config['SESSION_FILE'])
+
+@contextmanager
+def session_lock():
+    """Exclusive lock around a load-modify-save of the session file across workers"""
+    with open(current_app.config['SESSION_FILE'] + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def candidate_key(candidate):
+    """Stable identity of a ranked candidate (names come from the LLM and can repeat)"""
+    return candidate.get('cv_hash') or candidate.get('cv_filename')
+
+def parse_candidate_updates(updates):
+    """Validate status/notes updates. Raises ValueError on malformed input.
+    
+    Each update names its candidate by cv_hash, or by candidate_name for
+    callers that predate cv_hash.
+    """
+    if not isinstance(updates, list):
+        raise ValueError("updates must be a list")
+    
+    parsed = []
+    for update in updates:
+        if not isinstance(update, dict) or not (update.get('cv_hash') or update.get('candidate_name')):
+            raise ValueError("Each update needs a cv_hash or candidate_name")
+        
+        update = dict(update)
+        if update.get('version') is not None:
+            try:
+                update['version'] = int(update['version'])
+            except (TypeError, ValueError):
+                who = update.get('cv_hash') or update['candidate_name']
+                raise ValueError(f"Invalid version for {who}: {update['version']!r}")
+        parsed.append(update)
+    
+    return parsed
+
+def apply_candidate_updates(candidates, updates):
+    """Apply status/notes changes to candidates with optimistic version checks.
+    
+    Updates are matched on cv_hash, or on the first candidate with the given
+    candidate_name when there is none. All-or-nothing: returns (applied,
+    conflicts, missing) and only mutates `candidates` when there are no
+    conflicts and no unknown candidates.
+    """
+    by_key = {candidate_key(c): c for c in candidates}
+    by_name = {}
+    for c in candidates:
+        by_name.setdefault(c.get('candidate_name'), c)
+    matched = []
+    conflicts = []
+    missing = []
+    
+    for update in updates:
+        if update.get('cv_hash'):
+            candidate = by_key.get(update['cv_hash'])
+        else:
+            candidate = by_name.get(update['candidate_name'])
+        
+        if candidate is None:
+            missing.append(update.get('cv_hash') or update['candidate_name'])
+            continue
+        matched.append((update, candidate))
+        
+        expected = update.get('version')
+        if expected is not None and expected != candidate.get('version', 0):
+            conflicts.append({
+                "cv_hash": candidate_key(candidate),
+                "candidate_name": candidate.get('candidate_name'),
+                "expected_version": expected,
+                "current_version": candidate.get('version', 0),
+                "status": candidate.get('status'),
+                "notes": candidate.get('notes')
+            })
+    
+    if conflicts or missing:
+        return [], conflicts, missing
+    
+    applied = []
+    for update, candidate in matched:
+        if update.get('status'):
+            candidate['status'] = update['status']
+        if update.get('notes') is not None:
+            candidate['notes'] = update['notes']
+        candidate['version'] = candidate.get('version', 0) + 1
+        applied.append({
+            "cv_hash": candidate_key(candidate),
+            "candidate_name": candidate.get('candidate_name'),
+            "version": candidate['version'],
+            "status": candidate['status']
+        })
+    
+    return applied, conflicts, missing
 
 # ENHANCED SYSTEM PROMPT WITH CONSISTENT SCORING
 SYSTEM_PROMPT = """
@@ -119,6 +430,10 @@ CRITICAL SCORING RULES - ENSURE CONSISTENCY:
    - First: Overall fit and strengths
    - Second: Gap or concern
 
+6. PRE-EXTRACTED FIELDS:
+   - The CV may be followed by fields found by pattern matching (RTW, GMC, NMC, DBS, email)
+   - Use them as a starting point, but the CV text wins if it disagrees
+
 OUTPUT VALID JSON ONLY:
 {
   "candidate_name": "string",
@@ -191,13 +506,174 @@ TalentScope UK
 {sender_email}
 """
 
-@app.route('/')
+def ingest_unseen(mail, api_instance):
+    """Store CVs from every UNSEEN message in the selected mailbox and acknowledge senders.
+    
+    Shared by /sync_email and the IMAP IDLE daemon so hashing, dedupe and
+    acknowledgments behave identically however mail is picked up.
+    """
+    import email
+    
+    new_cvs = 0
+    acknowledgments_sent = 0
+    stored = []
+    
+    status, messages = mail.search(None, 'UNSEEN')
+    
+    if status != "OK":
+        raise RuntimeError("IMAP search failed")
+    
+    email_ids = messages[0].split()
+    
+    for email_id in email_ids:
+        try:
+            status, msg_data = mail.fetch(email_id, '(RFC822)')
+            
+            if status != "OK":
+                continue
+            
+            raw_email = msg_data[0][1]
+            email_message = email.message_from_bytes(raw_email)
+            
+            sender = email_message.get("From", "unknown@unknown.com")
+            
+            # Extract clean email address
+            sender_email = sender
+            if '<' in sender and '>' in sender:
+                sender_email = sender.split('<')[1].split('>')[0].strip()
+            
+            # Extract sender name
+            sender_name = "Applicant"
+            if '<' in sender:
+                sender_name = sender.split('<')[0].strip().strip('"')
+            
+            attachments = [
+                (part.get_filename(), part.get_payload(decode=True))
+                for part in email_message.walk()
+                if part.get_content_maintype() != 'multipart'
+                and part.get('Content-Disposition') is not None
+                and part.get_filename()
+                and part.get_filename().lower().endswith('.pdf')
+            ]
+            
+            cv_found = False
+            
+            if attachments:
+                # Short locked write so the daemon, this route and recruiter edits never clobber each other
+                with session_lock():
+                    data = load_data()
+                    for filename, file_bytes in attachments:
+                        fpath, f_hash, created = store_cv(data, file_bytes, filename, "email", sender=sender)
+                        
+                        if created:
+                            new_cvs += 1
+                            cv_found = True
+                            stored.append((fpath, f_hash))
+                            
+                            print(f"NEW EMAIL CV: {os.path.basename(fpath)} ({filename}) from {sender_email}")
+                    save_data(data)
+            
+            # SEND AUTO-ACKNOWLEDGMENT if CV was found
+            if cv_found:
+                try:
+                    acknowledgment_message = f"""Dear {sender_name},
+
+Thank you for submitting your application to TalentScope UK. We have successfully received your CV and it will be reviewed by our recruitment team.
+
+Our AI-powered screening system will evaluate your application against our current vacancies, and we will contact you within 5 working days if your profile matches our requirements.
+
+We appreciate your interest in joining our organisation and wish you the best in your career journey.
+
+Best regards,
+
+{current_app.config['SENDER_NAME']}
+Recruitment Team
+TalentScope UK
+{current_app.config['SENDER_EMAIL']}"""
+
+                    send_smtp_email = get_brevo_sdk().SendSmtpEmail(
+                        to=[{"email": sender_email, "name": sender_name}],
+                        sender={"name": current_app.config['SENDER_NAME'], "email": current_app.config['SENDER_EMAIL']},
+                        subject="Application Received - TalentScope UK",
+                        html_content=f"<html><body><p style='white-space: pre-line;'>{acknowledgment_message}</p></body></html>"
+                    )
+                    
+                    api_instance.send_transac_email(send_smtp_email)
+                    acknowledgments_sent += 1
+                    
+                    print(f"AUTO-ACKNOWLEDGMENT SENT to {sender_email}")
+                    
+                except Exception as ack_error:
+                    print(f"Failed to send acknowledgment to {sender_email}: {ack_error}")
+                    # Don't fail the entire sync if acknowledgment fails
+            
+            # Mark email as read
+            mail.store(email_id, '+FLAGS', '\\Seen')
+            
+        except Exception as e:
+            print(f"Email processing error: {e}")
+            continue
+    
+    return {
+        "new_cvs": new_cvs,
+        "acknowledgments_sent": acknowledgments_sent,
+        "total_emails_processed": len(email_ids),
+        "stored": stored
+    }
+
+def score_cv(jd, cv_text, cv_hints=None):
+    """Score one CV against a JD with the LLM"""
+    content = f"JD:\n{jd}\n\n---\n\nCV:\n{compact_text(cv_text)}"
+    if cv_hints:
+        content += f"\n\n---\n\nPRE-EXTRACTED:\n{json.dumps(cv_hints, separators=(',', ':'))}"
+    
+    response = get_openai_client().chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": content}
+        ],
+        response_format={"type": "json_object"},
+        timeout=60
+    )
+    
+    return json.loads(response.choices[0].message.content)
+
+def screen_cv(data, jd, fpath, cv_text):
+    """Analysis of one CV: a local rejection when the pre-screen settles it, else the LLM score.
+    
+    Returns (analysis, used_llm). Rejections stay in the ranking at score 0 with
+    their reason, so a recruiter can overrule a misread CV.
+    """
+    fields = get_prescreen(data, fpath, cv_text)
+    reason = rejection_reason(fields, jd)
+    
+    if reason:
+        original_name = data["cv_metadata"].get(fpath, {}).get("original_filename") or os.path.basename(fpath)
+        return {
+            "candidate_name": fields.get("email") or original_name,
+            "score": 0,
+            "stat_score": 0,
+            "tech_score": 0,
+            "team_score": 0,
+            "summary": reason,
+            "rationale": [reason],
+            "email": fields.get("email") or "",
+            "email_body": "",
+            "dismissed": False,
+            "industry": "",
+            "prescreen_rejection": reason
+        }, False
+    
+    return score_cv(jd, cv_text, hints(fields)), True
+
+@bp.route('/')
 def dashboard():
     return redirect('/pipeline')
 
-@app.route('/pipeline')
-@app.route('/review')
-@app.route('/config')
+@bp.route('/pipeline')
+@bp.route('/review')
+@bp.route('/config')
 def tabs():
     view_map = {
         '/pipeline': 'pipeline',
@@ -207,7 +683,7 @@ def tabs():
     view = view_map.get(request.path, 'pipeline')
     return render_template('index.html', view=view)
 
-@app.route('/generate_jd', methods=['POST'])
+@bp.route('/generate_jd', methods=['POST'])
 def generate_jd():
     """Generate job description"""
     try:
@@ -225,7 +701,7 @@ Requirements:
 - 300-400 words
 """
 
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             timeout=30
@@ -238,18 +714,43 @@ Requirements:
         log_system_event("ERROR", "JD generation failed", {"error": str(e)})
         return jsonify({"error": str(e)}), 500
 
-@app.route('/analyze_tribunal', methods=['POST'])
+@bp.route('/analyze_tribunal', methods=['POST'])
 def analyze_tribunal():
     """Analyze CVs with intelligent matching"""
     try:
         jd = request.form.get('full_jd', '').strip()
         mode = request.form.get('mode', 'new')
+        requisition_id = request.form.get('requisition_id', '').strip()
+        role_title = request.form.get('role_title', '').strip()
+        retry_failed = request.form.get('retry_failed') == 'true'
+        update_jd = request.form.get('update_jd') == 'true'
         
         if not jd:
             return jsonify({"error": "Job description required"}), 400
         
         data = load_data()
-        data["candidates"] = []
+        jd_hash = get_jd_hash(jd)
+        
+        # A named requisition only takes a different JD when the recruiter confirms
+        # it; otherwise another role's JD would silently replace its ranking
+        existing = get_requisition(data, requisition_id) if requisition_id else None
+        if existing and existing.get("jd_hash") not in (None, jd_hash) and not update_jd:
+            return jsonify({
+                "error": f"This JD differs from the one screened for \"{existing.get('title', requisition_id)}\"",
+                "jd_changed": True,
+                "requisition_id": requisition_id,
+                "title": existing.get("title", "")
+            }), 409
+        
+        # Same JD -> same requisition, unless the caller names one explicitly
+        requisition_id = requisition_id or f"req_{jd_hash[:12]}"
+        
+        scored = []
+        touched = set()
+        llm_calls = 0
+        cache_hits = 0
+        versions_skipped = 0
+        prescreen_rejections = 0
         
         files_to_process = []
         
@@ -259,283 +760,252 @@ def analyze_tribunal():
             if not uploaded_files or len(uploaded_files) == 0:
                 return jsonify({"error": "No files uploaded"}), 400
             
-            for f in uploaded_files:
-                if not f or f.filename == '':
-                    continue
-                
-                file_bytes = f.read()
-                f_hash = get_file_hash(file_bytes)
-                
-                if f_hash in data.get("hashes", {}):
-                    fpath = data["hashes"][f_hash]
-                else:
-                    fname = secure_filename(f.filename)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    unique_fname = f"{timestamp}_{fname}"
-                    fpath = os.path.join(app.config['UPLOAD_FOLDER'], unique_fname)
-                    
-                    with open(fpath, "wb") as buffer:
-                        buffer.write(file_bytes)
-                    
-                    if "hashes" not in data:
-                        data["hashes"] = {}
-                    data["hashes"][f_hash] = fpath
-                    
-                    if "cv_metadata" not in data:
-                        data["cv_metadata"] = {}
-                    data["cv_metadata"][fpath] = {
-                        "original_filename": fname,
-                        "upload_date": datetime.now().isoformat(),
-                        "hash": f_hash,
-                        "source": "manual"
-                    }
-                    
-                    data["ingestion_stats"]["manual"] = data.get("ingestion_stats", {}).get("manual", 0) + 1
-                
-                files_to_process.append(fpath)
+            uploads = [(secure_filename(f.filename), f.read()) for f in uploaded_files if f and f.filename != '']
+            
+            # Short locked write, as for email ingestion; the slow work below runs unlocked
+            with session_lock():
+                data = load_data()
+                for filename, file_bytes in uploads:
+                    fpath, f_hash, created = store_cv(data, file_bytes, filename, "manual")
+                    files_to_process.append((fpath, f_hash))
+                save_data(data)
                 
         elif mode == 'warehouse':
-            files_to_process = glob.glob(os.path.join(app.config['UPLOAD_FOLDER'], '*.pdf'))
+            files_to_process = [(record["path"], record["hash"]) for record in services().catalogue.records()]
             
             if len(files_to_process) == 0:
                 return jsonify({"error": "No CVs in warehouse"}), 400
 
-        # Process each CV
-        for fpath in files_to_process:
+        # Group versions of the same person; only the newest one is scored
+        known = services().person_index.known()
+        texts = {}
+        for fpath, f_hash in files_to_process:
+            if f_hash not in texts:
+                texts[f_hash] = None if f_hash in known else get_cv_text(data, fpath, f_hash, retry_failed)
+                touched.add(fpath)
+        people = services().person_index.assign(texts)
+        
+        versions = {}
+        for f_hash, fpath in {f_hash: fpath for fpath, f_hash in files_to_process}.items():
+            if f_hash in people:
+                versions.setdefault(people[f_hash], []).append((fpath, f_hash))
+        
+        for cvs in versions.values():
+            cvs.sort(key=lambda cv: data["cv_metadata"].get(cv[0], {}).get("upload_date") or "", reverse=True)
+            versions_skipped += len(cvs) - 1
+        
+        # Score the newest CV of each person against the snapshot; nothing is saved yet
+        for person_id, cvs in versions.items():
+            fpath, f_hash = cvs[0]
             try:
-                reader = pypdf.PdfReader(fpath)
-                cv_text = " ".join(
-                    page.extract_text() 
-                    for page in reader.pages 
-                    if page.extract_text()
-                )
-                
-                if not cv_text or len(cv_text.strip()) < 50:
-                    continue
+                # A CV already scored against this exact JD never goes back to the LLM
+                cache_key = f"{f_hash}:{jd_hash}"
+                analysis = services().score_cache.get(cache_key)
                 
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": f"JD:\n{jd}\n\n---\n\nCV:\n{cv_text}"}
-                    ],
-                    response_format={"type": "json_object"},
-                    timeout=60
-                )
-                
-                analysis = json.loads(response.choices[0].message.content)
+                if analysis is None:
+                    cv_text = texts.get(f_hash) or get_cv_text(data, fpath, f_hash, retry_failed)
+                    touched.add(fpath)
+                    if cv_text is None:
+                        continue
+                    
+                    analysis, used_llm = screen_cv(data, jd, fpath, cv_text)
+                    if used_llm:
+                        # Rejections are cheap to redo and must follow pre-screen rule changes
+                        services().score_cache.put(cache_key, analysis)
+                        llm_calls += 1
+                    else:
+                        prescreen_rejections += 1
+                else:
+                    cache_hits += 1
                 
                 if not analysis.get('dismissed', False):
-                    analysis['cv_filename'] = os.path.basename(fpath)
-                    analysis['upload_timestamp'] = datetime.now().isoformat()
-                    analysis['status'] = 'Applied'
-                    analysis['notes'] = ''
-                    data["candidates"].append(analysis)
+                    scored.append((person_id, cvs, analysis))
                     
             except Exception as e:
                 print(f"ERROR: {e}")
                 continue
         
-        save_data(data)
-        
-        sorted_candidates = sorted(
-            data["candidates"], 
-            key=lambda x: x.get('score', 0), 
-            reverse=True
-        )
-        
-        log_system_event("ANALYSIS_COMPLETE", f"Analysed {len(sorted_candidates)} candidates", {"mode": mode})
+        # Merge onto whatever other workers saved meanwhile (recruiter edits, new email CVs)
+        with session_lock():
+            fresh = load_data()
+            
+            for fpath in touched:
+                if fpath in data["cv_metadata"] and os.path.exists(fpath):
+                    fresh["cv_metadata"].setdefault(fpath, {}).update(data["cv_metadata"][fpath])
+            
+            now = datetime.now().isoformat()
+            requisition = fresh["requisitions"].setdefault(requisition_id, {
+                "id": requisition_id,
+                "title": role_title or jd.splitlines()[0].strip('*# ')[:80],
+                "created_at": now,
+                "candidates": []
+            })
+            requisition["jd"] = jd
+            requisition["jd_hash"] = jd_hash
+            requisition["updated_at"] = now
+            if role_title:
+                requisition["title"] = role_title
+            fresh["active_requisition"] = requisition_id
+            
+            # Recruiter decisions survive a re-run, including ones made while it ran
+            previous = {c.get('cv_hash'): c for c in requisition["candidates"] if c.get('cv_hash')}
+            previous_people = {c.get('person_id'): c for c in requisition["candidates"] if c.get('person_id')}
+            ranked = []
+            
+            for person_id, cvs, analysis in scored:
+                fpath, f_hash = cvs[0]
+                earlier = previous.get(f_hash) or previous_people.get(person_id, {})
+                candidate = dict(analysis)
+                candidate['cv_filename'] = os.path.basename(fpath)
+                candidate['cv_hash'] = f_hash
+                candidate['person_id'] = person_id
+                candidate['cv_versions'] = len(cvs)
+                candidate['earlier_cvs'] = [os.path.basename(path) for path, _ in cvs[1:]]
+                candidate['requisition_id'] = requisition_id
+                candidate['upload_timestamp'] = earlier.get('upload_timestamp', now)
+                candidate['status'] = earlier.get('status', 'Applied')
+                candidate['notes'] = earlier.get('notes', '')
+                candidate['version'] = earlier.get('version', 0)
+                ranked.append(candidate)
+            
+            # A warehouse run re-ranks everyone; an upload only adds or replaces its own CVs
+            if mode != 'warehouse':
+                rescored_hashes = {c['cv_hash'] for c in ranked}
+                rescored_people = {c['person_id'] for c in ranked}
+                ranked += [
+                    c for c in requisition["candidates"]
+                    if c.get('cv_hash') not in rescored_hashes and c.get('person_id') not in rescored_people
+                ]
+            
+            sorted_candidates = sorted(
+                ranked, 
+                key=lambda x: x.get('score', 0), 
+                reverse=True
+            )
+            requisition["candidates"] = sorted_candidates
+            
+            save_data(fresh)
+        
+        log_system_event("ANALYSIS_COMPLETE", f"Analysed {len(scored)} candidates", {
+            "mode": mode,
+            "requisition_id": requisition_id,
+            "llm_calls": llm_calls,
+            "cache_hits": cache_hits,
+            "versions_skipped": versions_skipped,
+            "prescreen_rejections": prescreen_rejections
+        })
         return jsonify(sorted_candidates)
         
     except Exception as e:
         log_system_event("ERROR", "Analysis failed", {"error": str(e)})
         return jsonify({"error": str(e)}), 500
 
-@app.route('/sync_email', methods=['POST'])
+@bp.route('/sync_email', methods=['POST'])
 def sync_email():
     """Sync CVs from IMAP inbox with auto-acknowledgment"""
     try:
-        if not IMAP_PASSWORD:
+        if not current_app.config['IMAP_PASSWORD']:
             return jsonify({"error": "IMAP not configured"}), 400
         
-        data = load_data()
-        new_cvs = 0
-        acknowledgments_sent = 0
-        
         # Brevo API instance for sending acknowledgments
-        api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-            sib_api_v3_sdk.ApiClient(configuration)
-        )
-        
-        mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-        mail.login(IMAP_USER, IMAP_PASSWORD)
-        mail.select("inbox")
+        api_instance = get_brevo_api()
         
-        status, messages = mail.search(None, 'UNSEEN')
+        import imaplib
         
-        if status != "OK":
-            return jsonify({"error": "IMAP search failed"}), 500
-        
-        email_ids = messages[0].split()
+        mail = imaplib.IMAP4_SSL(current_app.config['IMAP_SERVER'])
+        mail.login(current_app.config['IMAP_USER'], current_app.config['IMAP_PASSWORD'])
+        mail.select("inbox")
         
-        for email_id in email_ids:
-            try:
-                status, msg_data = mail.fetch(email_id, '(RFC822)')
-                
-                if status != "OK":
-                    continue
-                
-                raw_email = msg_data[0][1]
-                email_message = email.message_from_bytes(raw_email)
-                
-                sender = email_message.get("From", "unknown@unknown.com")
-                
-                # Extract clean email address
-                sender_email = sender
-                if '<' in sender and '>' in sender:
-                    sender_email = sender.split('<')[1].split('>')[0].strip()
-                
-                # Extract sender name
-                sender_name = "Applicant"
-                if '<' in sender:
-                    sender_name = sender.split('<')[0].strip().strip('"')
-                
-                cv_found = False
-                
-                for part in email_message.walk():
-                    if part.get_content_maintype() == 'multipart':
-                        continue
-                    if part.get('Content-Disposition') is None:
-                        continue
-                    
-                    filename = part.get_filename()
-                    if filename and filename.lower().endswith('.pdf'):
-                        file_bytes = part.get_payload(decode=True)
-                        f_hash = get_file_hash(file_bytes)
-                        
-                        if f_hash not in data.get("hashes", {}):
-                            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                            safe_filename = secure_filename(filename)
-                            unique_fname = f"{timestamp}_email_{safe_filename}"
-                            fpath = os.path.join(app.config['UPLOAD_FOLDER'], unique_fname)
-                            
-                            with open(fpath, 'wb') as f:
-                                f.write(file_bytes)
-                            
-                            if "hashes" not in data:
-                                data["hashes"] = {}
-                            data["hashes"][f_hash] = fpath
-                            
-                            if "cv_metadata" not in data:
-                                data["cv_metadata"] = {}
-                            data["cv_metadata"][fpath] = {
-                                "original_filename": filename,
-                                "upload_date": datetime.now().isoformat(),
-                                "hash": f_hash,
-                                "source": "email",
-                                "sender": sender
-                            }
-                            
-                            data["ingestion_stats"]["email"] = data.get("ingestion_stats", {}).get("email", 0) + 1
-                            
-                            new_cvs += 1
-                            cv_found = True
-                            
-                            print(f"NEW EMAIL CV: {unique_fname} from {sender_email}")
-                
-                # SEND AUTO-ACKNOWLEDGMENT if CV was found
-                if cv_found:
-                    try:
-                        acknowledgment_message = f"""Dear {sender_name},
-
-Thank you for submitting your application to TalentScope UK. We have successfully received your CV and it will be reviewed by our recruitment team.
-
-Our AI-powered screening system will evaluate your application against our current vacancies, and we will contact you within 5 working days if your profile matches our requirements.
-
-We appreciate your interest in joining our organisation and wish you the best in your career journey.
-
-Best regards,
-
-{SENDER_NAME}
-Recruitment Team
-TalentScope UK
-{SENDER_EMAIL}"""
-
-                        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-                            to=[{"email": sender_email, "name": sender_name}],
-                            sender={"name": SENDER_NAME, "email": SENDER_EMAIL},
-                            subject="Application Received - TalentScope UK",
-                            html_content=f"<html><body><p style='white-space: pre-line;'>{acknowledgment_message}</p></body></html>"
-                        )
-                        
-                        api_instance.send_transac_email(send_smtp_email)
-                        acknowledgments_sent += 1
-                        
-                        print(f"AUTO-ACKNOWLEDGMENT SENT to {sender_email}")
-                        
-                    except Exception as ack_error:
-                        print(f"Failed to send acknowledgment to {sender_email}: {ack_error}")
-                        # Don't fail the entire sync if acknowledgment fails
-                
-                # Mark email as read
-                mail.store(email_id, '+FLAGS', '\\Seen')
-                
-            except Exception as e:
-                print(f"Email processing error: {e}")
-                continue
+        result = ingest_unseen(mail, api_instance)
         
         mail.close()
         mail.logout()
         
-        save_data(data)
-        
-        log_system_event("EMAIL_SYNC", f"Synced {new_cvs} CVs, sent {acknowledgments_sent} acknowledgments")
+        log_system_event("EMAIL_SYNC", f"Synced {result['new_cvs']} CVs, sent {result['acknowledgments_sent']} acknowledgments")
         
         return jsonify({
             "status": "success",
-            "new_cvs": new_cvs,
-            "acknowledgments_sent": acknowledgments_sent,
-            "total_emails_processed": len(email_ids)
+            "new_cvs": result["new_cvs"],
+            "acknowledgments_sent": result["acknowledgments_sent"],
+            "total_emails_processed": result["total_emails_processed"]
         })
         
     except Exception as e:
         log_system_event("ERROR", "Email sync failed", {"error": str(e)})
         return jsonify({"error": str(e)}), 500
 
-@app.route('/update_candidate', methods=['POST'])
+@bp.route('/update_candidate', methods=['POST'])
 def update_candidate():
     """Update candidate status and notes"""
     try:
-        payload = request.json
-        candidate_name = payload.get('candidate_name')
+        payload = request.json or {}
         status = payload.get('status')
-        notes = payload.get('notes')
         
-        data = load_data()
+        try:
+            updates = parse_candidate_updates([payload])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        with session_lock():
+            data = load_data()
+            candidates = requisition_candidates(data, payload.get('requisition_id'))
+            applied, conflicts, missing = apply_candidate_updates(candidates, updates)
+            
+            if conflicts:
+                return jsonify({"error": "Candidate was changed by someone else", "conflicts": conflicts}), 409
+            if missing:
+                return jsonify({"error": "Candidate not found"}), 404
+            
+            save_data(data)
+        
+        log_system_event("CANDIDATE_UPDATED", f"Updated {applied[0]['candidate_name']}", {"status": status})
+        
+        return jsonify({"status": "success", "version": applied[0]["version"]})
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/bulk_update_candidates', methods=['POST'])
+def bulk_update_candidates():
+    """Apply many status/notes changes in one versioned write"""
+    try:
+        payload = request.json or {}
         
-        for candidate in data["candidates"]:
-            if candidate.get('candidate_name') == candidate_name:
-                if status:
-                    candidate['status'] = status
-                if notes is not None:
-                    candidate['notes'] = notes
-                break
+        if not payload.get('updates'):
+            return jsonify({"error": "No updates"}), 400
         
-        save_data(data)
+        try:
+            updates = parse_candidate_updates(payload['updates'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        with session_lock():
+            data = load_data()
+            candidates = requisition_candidates(data, payload.get('requisition_id'))
+            applied, conflicts, missing = apply_candidate_updates(candidates, updates)
+            
+            if conflicts:
+                return jsonify({"error": "Some candidates were changed by someone else", "conflicts": conflicts}), 409
+            if missing:
+                return jsonify({"error": "Candidates not found", "missing": missing}), 404
+            
+            save_data(data)
         
-        log_system_event("CANDIDATE_UPDATED", f"Updated {candidate_name}", {"status": status})
+        log_system_event("CANDIDATES_BULK_UPDATED", f"Updated {len(applied)} candidates", {
+            "statuses": {u["cv_hash"]: u["status"] for u in applied}
+        })
         
-        return jsonify({"status": "success"})
+        return jsonify({"status": "success", "updated": applied})
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/get_analytics', methods=['GET'])
+@bp.route('/get_analytics', methods=['GET'])
 def get_analytics():
-    """Get analytics data"""
+    """Get analytics data for a requisition"""
     try:
         data = load_data()
-        candidates = data.get("candidates", [])
+        candidates = requisition_candidates(data, request.args.get('requisition_id'))
         
         industry_dist = {}
         for c in candidates:
@@ -569,14 +1039,14 @@ def get_analytics():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/get_logs', methods=['GET'])
+@bp.route('/get_logs', methods=['GET'])
 def get_logs():
     """Get system logs"""
     try:
-        if not os.path.exists(app.config['LOGS_FILE']):
+        if not os.path.exists(current_app.config['LOGS_FILE']):
             return jsonify([])
         
-        with open(app.config['LOGS_FILE'], 'r', encoding='utf-8') as f:
+        with open(current_app.config['LOGS_FILE'], 'r', encoding='utf-8') as f:
             logs = json.load(f)
         
         return jsonify(logs[-50:])
@@ -584,19 +1054,17 @@ def get_logs():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/send_outreach', methods=['POST'])
+@bp.route('/send_outreach', methods=['POST'])
 def send_outreach():
     """Send single email"""
     try:
         payload = request.json
         
-        api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-            sib_api_v3_sdk.ApiClient(configuration)
-        )
+        api_instance = get_brevo_api()
         
-        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+        send_smtp_email = get_brevo_sdk().SendSmtpEmail(
             to=[{"email": payload['email'], "name": payload.get('candidate_name', '')}],
-            sender={"name": SENDER_NAME, "email": SENDER_EMAIL},
+            sender={"name": current_app.config['SENDER_NAME'], "email": current_app.config['SENDER_EMAIL']},
             subject=payload.get('subject', "Your Application with TalentScope UK"),
             html_content=f"<html><body><p>{payload['message'].replace(chr(10), '<br>')}</p></body></html>"
         )
@@ -611,7 +1079,7 @@ def send_outreach():
         log_system_event("ERROR", "Email send failed", {"error": str(e)})
         return jsonify({"error": str(e)}), 500
 
-@app.route('/bulk_decision', methods=['POST'])
+@bp.route('/bulk_decision', methods=['POST'])
 def bulk_decision():
     """Bulk decisioning with consistent signatures"""
     try:
@@ -620,14 +1088,19 @@ def bulk_decision():
         preview_only = payload.get('preview_only', False)
         
         data = load_data()
-        candidates = data.get("candidates", [])
+        candidates = requisition_candidates(data, payload.get('requisition_id'))
         
         if len(candidates) == 0:
             return jsonify({"error": "No candidates"}), 400
         
+        # Pre-screen rejections never saw the LLM; a recruiter decides those by hand
+        held = [c.get('candidate_name', 'Candidate') for c in candidates if c.get('prescreen_rejection')]
+        candidates = [c for c in candidates if not c.get('prescreen_rejection')]
+        
         results = {
             "shortlisted": [],
             "regrets": [],
+            "held": held,
             "errors": [],
             "preview_messages": {}
         }
@@ -639,13 +1112,13 @@ def bulk_decision():
                 
                 if score >= threshold:
                     try:
-                        response = client.chat.completions.create(
+                        response = get_openai_client().chat.completions.create(
                             model="gpt-4o",
                             messages=[{"role": "user", "content": SHORTLIST_EMAIL_TEMPLATE.format(
                                 candidate_name=name,
                                 rationale="\n".join(candidate.get('rationale', [])),
-                                sender_name=SENDER_NAME,
-                                sender_email=SENDER_EMAIL
+                                sender_name=current_app.config['SENDER_NAME'],
+                                sender_email=current_app.config['SENDER_EMAIL']
                             )}],
                             timeout=30
                         )
@@ -657,10 +1130,10 @@ Congratulations on being shortlisted!
 
 Best regards,
 
-{SENDER_NAME}
+{current_app.config['SENDER_NAME']}
 Recruitment Team
 TalentScope UK
-{SENDER_EMAIL}"""
+{current_app.config['SENDER_EMAIL']}"""
                     
                     results["preview_messages"][name] = {"type": "shortlist", "message": message}
                 else:
@@ -672,7 +1145,7 @@ We wish you success in your career search.
 
 Best regards,
 
-{SENDER_NAME}
+{current_app.config['SENDER_NAME']}
 Recruitment Team
 TalentScope UK"""
                     results["preview_messages"][name] = {"type": "regret", "message": regret}
@@ -680,9 +1153,7 @@ TalentScope UK"""
             return jsonify(results)
         
         # Actual sending
-        api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-            sib_api_v3_sdk.ApiClient(configuration)
-        )
+        api_instance = get_brevo_api()
         
         for candidate in candidates:
             email_addr = candidate.get('email', '').strip()
@@ -696,19 +1167,19 @@ TalentScope UK"""
             try:
                 if score >= threshold:
                     try:
-                        response = client.chat.completions.create(
+                        response = get_openai_client().chat.completions.create(
                             model="gpt-4o",
                             messages=[{"role": "user", "content": SHORTLIST_EMAIL_TEMPLATE.format(
                                 candidate_name=name,
                                 rationale="\n".join(candidate.get('rationale', [])),
-                                sender_name=SENDER_NAME,
-                                sender_email=SENDER_EMAIL
+                                sender_name=current_app.config['SENDER_NAME'],
+                                sender_email=current_app.config['SENDER_EMAIL']
                             )}],
                             timeout=30
                         )
                         message = response.choices[0].message.content.strip()
                     except:
-                        message = f"Dear {name},\n\nCongratulations!\n\nBest regards,\n\n{SENDER_NAME}\nRecruitment Team\nTalentScope UK\n{SENDER_EMAIL}"
+                        message = f"Dear {name},\n\nCongratulations!\n\nBest regards,\n\n{current_app.config['SENDER_NAME']}\nRecruitment Team\nTalentScope UK\n{current_app.config['SENDER_EMAIL']}"
                     
                     subject = "Interview Invitation - TalentScope UK"
                 else:
@@ -721,13 +1192,13 @@ We wish you success in your career search.
 
 Best regards,
 
-{SENDER_NAME}
+{current_app.config['SENDER_NAME']}
 Recruitment Team
 TalentScope UK"""
                 
-                send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+                send_smtp_email = get_brevo_sdk().SendSmtpEmail(
                     to=[{"email": email_addr, "name": name}],
-                    sender={"name": SENDER_NAME, "email": SENDER_EMAIL},
+                    sender={"name": current_app.config['SENDER_NAME'], "email": current_app.config['SENDER_EMAIL']},
                     subject=subject,
                     html_content=f"<html><body><p style='white-space: pre-line;'>{message}</p></body></html>"
                 )
@@ -750,16 +1221,26 @@ TalentScope UK"""
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/clear_memory', methods=['POST'])
+@bp.route('/clear_memory', methods=['POST'])
 def clear_memory():
     """Clear all CVs"""
     try:
-        cv_files = glob.glob(os.path.join(app.config['UPLOAD_FOLDER'], '*.pdf'))
-        for f in cv_files:
-            os.remove(f)
-        
-        data = {"candidates": [], "hashes": {}, "cv_metadata": {}, "ingestion_stats": {"email": 0, "manual": 0}}
-        save_data(data)
+        with session_lock():
+            # Catalogued CVs plus any PDF that reached the folder without being catalogued
+            report = services().catalogue.reconcile()
+            missing = set(report["missing"])
+            cv_files = [path for path in services().catalogue.paths() if path not in missing] + report["untracked"]
+            for f in cv_files:
+                if os.path.exists(f):
+                    os.remove(f)
+            services().catalogue.clear()
+            services().cv_store.clear_aliases()
+            services().text_cache.clear()
+            services().score_cache.clear()
+            services().person_index.clear()
+            services().cv_store.prune_empty_shards()
+            
+            save_data(empty_data())
         
         log_system_event("MEMORY_CLEARED", f"Deleted {len(cv_files)} CVs")
         
@@ -768,19 +1249,20 @@ def clear_memory():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/get_candidate_data')
+@bp.route('/get_candidate_data')
 def get_candidate():
     """Retrieve candidate data"""
     try:
+        cv_hash = request.args.get('cv_hash', '').strip()
         name = request.args.get('name', '').strip()
         
-        if not name:
-            return jsonify({"error": "No name provided"}), 400
+        if not cv_hash and not name:
+            return jsonify({"error": "No candidate provided"}), 400
         
         data = load_data()
         
-        for candidate in data["candidates"]:
-            if candidate.get('candidate_name') == name:
+        for candidate in requisition_candidates(data, request.args.get('requisition_id')):
+            if (candidate_key(candidate) == cv_hash) if cv_hash else (candidate.get('candidate_name') == name):
                 if 'status' not in candidate:
                     candidate['status'] = 'Applied'
                 if 'notes' not in candidate:
@@ -792,15 +1274,18 @@ def get_candidate():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/download_cv/<filename>')
+@bp.route('/download_cv/<filename>')
 def download_cv(filename):
     """Download CV"""
     try:
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
+        fpath, download_name = services().cv_store.resolve(filename)
+        if fpath:
+            return send_file(fpath, as_attachment=True, download_name=download_name)
+        return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
     except:
         return jsonify({"error": "File not found"}), 404
 
-@app.route('/generate_campaign', methods=['POST'])
+@bp.route('/generate_campaign', methods=['POST'])
 def generate_campaign():
     """Generate marketing content with improved formatting"""
     try:
@@ -809,7 +1294,7 @@ def generate_campaign():
         if not jd:
             return jsonify({"error": "JD required"}), 400
         
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "UK recruitment marketing expert. Output valid JSON with properly formatted content."},
@@ -833,17 +1318,18 @@ def generate_campaign():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/stats')
+@bp.route('/api/stats')
 def get_stats():
     """Get stats"""
     try:
         data = load_data()
-        cv_count = len(glob.glob(os.path.join(app.config['UPLOAD_FOLDER'], '*.pdf')))
+        cv_count = services().catalogue.count()
         
         ingestion_stats = data.get("ingestion_stats", {"email": 0, "manual": 0})
         
         return jsonify({
-            "total_candidates": len(data.get("candidates", [])),
+            "total_candidates": len(requisition_candidates(data)),
+            "total_requisitions": len(data.get("requisitions", {})),
             "total_cvs_stored": cv_count,
             "email_ingestion": ingestion_stats.get("email", 0),
             "manual_ingestion": ingestion_stats.get("manual", 0)
@@ -852,5 +1338,84 @@ def get_stats():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@bp.route('/api/requisitions')
+def list_requisitions():
+    """List requisitions, most recently screened first"""
+    try:
+        data = load_data()
+        requisitions = [requisition_summary(data, r) for r in data.get("requisitions", {}).values()]
+        requisitions.sort(key=lambda r: r.get("updated_at") or "", reverse=True)
+        
+        return jsonify(requisitions)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/api/requisitions/<requisition_id>/activate', methods=['POST'])
+def activate_requisition(requisition_id):
+    """Switch the active requisition and return its JD and ranking"""
+    try:
+        with session_lock():
+            data = load_data()
+            requisition = get_requisition(data, requisition_id)
+            
+            if requisition is None:
+                return jsonify({"error": "Requisition not found"}), 404
+            
+            data["active_requisition"] = requisition_id
+            save_data(data)
+        
+        return jsonify({
+            "requisition": requisition_summary(data, requisition),
+            "jd": requisition.get("jd", ""),
+            "candidates": requisition.get("candidates", [])
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/api/catalogue/reconcile', methods=['POST'])
+def reconcile_catalogue():
+    """Detect (and optionally repair) drift between the catalogue and the warehouse"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        repair = bool(payload.get('repair', False))
+        
+        data = load_data()
+        report = services().catalogue.reconcile(repair=repair, metadata=data.get("cv_metadata", {}))
+        
+        log_system_event("CATALOGUE_RECONCILED", f"{len(report['missing'])} missing, {len(report['untracked'])} untracked", {"repair": repair})
+        
+        return jsonify(report)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def create_app(overrides=None):
+    """Build the Flask app.
+    
+    Settings come from the environment (see load_config), with `overrides`
+    applied on top. Only config, directories, the storage handles and the
+    one-off catalogue build happen here; heavy modules and API clients are
+    created lazily in each worker. Serve with `gunicorn 'app:create_app()'`.
+    """
+    app = Flask(__name__)
+    app.config.update(load_config())
+    app.config.update(overrides or {})
+    
+    # Create necessary directories
+    Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
+    Path(app.config['DATA_FOLDER']).mkdir(parents=True, exist_ok=True)
+    
+    app.extensions["talentscope"] = build_services(app.config)
+    
+    # One-off catalogue build from the existing warehouse
+    with app.app_context():
+        if not services().catalogue.exists():
+            services().catalogue.reconcile(repair=True, metadata=load_data().get("cv_metadata", {}))
+    
+    app.register_blueprint(bp)
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    create_app().run(host='0.0.0.0', port=5000, debug=False)
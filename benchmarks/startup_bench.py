@@ -0,0 +1,91 @@
+"""Worker boot benchmark.
+
+Measures, in fresh interpreters, what a gunicorn worker pays on every boot and
+every systemd `Restart=always` recovery:
+
+  import    - `import app` plus create_app() (module-level work and app setup)
+  first_req - the above plus the first GET /api/stats through the test client
+
+Usage:
+
+    python benchmarks/startup_bench.py                  # this tree
+    python benchmarks/startup_bench.py --compare HEAD~1 # also an older revision
+
+The compared revision is unpacked with `git archive` into a temp directory.
+Revisions from before the app factory ignore TALENTSCOPE_ROOT and create their
+directories under /var/www/talentscope, so run comparisons on a dev box.
+"""
+import os, sys, json, shutil, argparse, tempfile, statistics, subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import app
+# Older revisions build the app at import time as `app.app`
+application = getattr(app, 'app', None) or app.create_app()
+t1 = time.perf_counter()
+client = application.test_client()
+client.get('/api/stats')
+t2 = time.perf_counter()
+print(json.dumps({"import": (t1 - t0) * 1000, "first_req": (t2 - t0) * 1000}))
+"""
+
+
+def measure(source_dir, runs, env):
+    samples = {"import": [], "first_req": []}
+
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=source_dir, env=env, capture_output=True, text=True, check=True
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        for key in samples:
+            samples[key].append(result[key])
+
+    return {
+        key: {"median": statistics.median(values), "min": min(values)}
+        for key, values in samples.items()
+    }
+
+
+def export_revision(ref, target):
+    archive = subprocess.run(["git", "archive", ref], cwd=REPO_ROOT, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+
+
+def report(label, stats):
+    print(f"{label:<24} import {stats['import']['median']:7.1f} ms (min {stats['import']['min']:6.1f})"
+          f"   first request {stats['first_req']['median']:7.1f} ms (min {stats['first_req']['min']:6.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import and first-request time")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--compare', metavar='REF', help="git revision to benchmark alongside this tree")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="talentscope-bench-")
+    env = dict(os.environ)
+    env["TALENTSCOPE_ROOT"] = os.path.join(workdir, "root")
+    # Older revisions build the OpenAI client at import and refuse to start without a key
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    try:
+        report("working tree", measure(REPO_ROOT, args.runs, env))
+
+        if args.compare:
+            source = os.path.join(workdir, "src")
+            os.makedirs(source)
+            export_revision(args.compare, source)
+            report(args.compare, measure(source, args.runs, env))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Compact on-disk catalogue of stored CVs.
+
+Every CV written to the warehouse gets one fixed-width binary record
+(hash, path, size, source, ingest date) appended to a single file, which is
+read back through mmap. Counting, listing and clearing the warehouse then
+touch one small file instead of globbing a directory that grows without
+limit. The reconciler detects (and optionally repairs) drift between the
+catalogue and what is actually on disk.
+"""
+import os, mmap, struct, fcntl, hashlib
+from contextlib import contextmanager
+from datetime import datetime
+
+MAGIC = b'TSCAT\x01\x00\x00'
+HEADER_SIZE = 16
+
+# flags (reserved, always 0), sha256 digest, size, ingested-at (epoch), source, path (utf-8, NUL padded)
+_RECORD = struct.Struct('<B32sQdB206s')
+RECORD_SIZE = _RECORD.size
+
+SOURCES = {"unknown": 0, "manual": 1, "email": 2}
+SOURCE_NAMES = {code: name for name, code in SOURCES.items()}
+
+
+class Catalogue:
+    """Append-only, mmap-read record of every CV stored under `root`"""
+
+    def __init__(self, path, root):
+        self.path = path
+        self.root = os.path.abspath(root)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @contextmanager
+    def _lock(self):
+        """Serialise writers across gunicorn workers"""
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _mapped(self):
+        """Yield a read-only mmap over the catalogue, or None if it holds no records"""
+        if not self.exists() or os.path.getsize(self.path) <= HEADER_SIZE:
+            yield None
+            return
+
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mm
+            finally:
+                mm.close()
+
+    def _relative(self, fpath):
+        fpath = os.path.abspath(fpath)
+        if fpath.startswith(self.root + os.sep):
+            return os.path.relpath(fpath, self.root)
+        return fpath
+
+    def _absolute(self, stored_path):
+        if os.path.isabs(stored_path):
+            return stored_path
+        return os.path.join(self.root, stored_path)
+
+    def _pack(self, f_hash, fpath, size, source, ingested_at):
+        encoded_path = self._relative(fpath).encode('utf-8')
+        if len(encoded_path) > 206:
+            raise ValueError(f"Path too long for catalogue: {fpath}")
+
+        return _RECORD.pack(
+            0,
+            bytes.fromhex(f_hash),
+            size,
+            ingested_at,
+            SOURCES.get(source, SOURCES["unknown"]),
+            encoded_path
+        )
+
+    def _unpack(self, mm, offset):
+        _, digest, size, ingested_at, source, raw_path = _RECORD.unpack_from(mm, offset)
+        return {
+            "hash": digest.hex(),
+            "path": self._absolute(raw_path.rstrip(b'\x00').decode('utf-8')),
+            "size": size,
+            "source": SOURCE_NAMES.get(source, "unknown"),
+            "ingested_at": datetime.fromtimestamp(ingested_at).isoformat()
+        }
+
+    def _offsets(self, mm):
+        return range(HEADER_SIZE, len(mm) - RECORD_SIZE + 1, RECORD_SIZE)
+
+    def _write_records(self, packed_records):
+        """Atomically replace the catalogue with the given packed records"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC.ljust(HEADER_SIZE, b'\x00'))
+            for packed in packed_records:
+                f.write(packed)
+        os.replace(tmp_path, self.path)
+
+    def add(self, f_hash, fpath, size, source, ingested_at=None):
+        """Append a record for a newly stored CV"""
+        record = self._pack(f_hash, fpath, size, source, ingested_at or datetime.now().timestamp())
+
+        with self._lock():
+            with open(self.path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(MAGIC.ljust(HEADER_SIZE, b'\x00'))
+                f.write(record)
+
+    def records(self):
+        """Yield catalogue records as dicts"""
+        with self._mapped() as mm:
+            if mm is None:
+                return
+            for offset in self._offsets(mm):
+                yield self._unpack(mm, offset)
+
+    def paths(self):
+        """Absolute paths of every catalogued CV"""
+        return [record["path"] for record in self.records()]
+
+    def count(self):
+        """Number of catalogued CVs (records are fixed-width, so no read is needed)"""
+        if not self.exists():
+            return 0
+        return max(0, os.path.getsize(self.path) - HEADER_SIZE) // RECORD_SIZE
+
+    def clear(self):
+        """Drop every record"""
+        with self._lock():
+            self._write_records([])
+
+    def _scan_root(self):
+        """Every PDF under root, including sharded subdirectories"""
+        found = []
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.lower().endswith('.pdf'):
+                            found.append(entry.path)
+            except FileNotFoundError:
+                continue
+        return found
+
+    def reconcile(self, repair=False, metadata=None):
+        """Compare the catalogue with the filesystem.
+
+        Returns the paths that are catalogued but missing on disk and those
+        on disk but not catalogued. With repair=True the catalogue is rewritten
+        to match the filesystem, using `metadata` (cv_metadata keyed by path)
+        for hash, source and date where available.
+        """
+        metadata = metadata or {}
+
+        with self._lock():
+            catalogued = {record["path"]: record for record in self.records()}
+            on_disk = set(self._scan_root())
+
+            missing = sorted(path for path in catalogued if path not in on_disk)
+            untracked = sorted(path for path in on_disk if path not in catalogued)
+
+            if repair and (missing or untracked or not self.exists()):
+                packed = [
+                    self._pack(
+                        record["hash"], path, record["size"], record["source"],
+                        datetime.fromisoformat(record["ingested_at"]).timestamp()
+                    )
+                    for path, record in catalogued.items() if path in on_disk
+                ]
+
+                for path in untracked:
+                    meta = metadata.get(path, {})
+                    f_hash = meta.get("hash")
+                    if not f_hash:
+                        with open(path, 'rb') as f:
+                            f_hash = hashlib.sha256(f.read()).hexdigest()
+                    try:
+                        ingested_at = datetime.fromisoformat(meta["upload_date"]).timestamp()
+                    except (KeyError, TypeError, ValueError):
+                        ingested_at = os.path.getmtime(path)
+                    packed.append(self._pack(
+                        f_hash, path, os.path.getsize(path),
+                        meta.get("source", "unknown"), ingested_at
+                    ))
+
+                self._write_records(packed)
+
+        return {
+            "catalogued": len(catalogued),
+            "on_disk": len(on_disk),
+            "missing": missing,
+            "untracked": untracked,
+            "repaired": repair
+        }
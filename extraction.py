@@ -0,0 +1,297 @@
+"""Isolated CV text extraction.
+
+PDF parsing runs in a small pool of recyclable subprocesses so that a
+malformed, encrypted or very long CV cannot pin a web worker or inflate its
+memory. Every extraction is bounded by a wall-clock timeout, a page limit and
+an RSS cap, and comes back as a plain dict describing what happened.
+"""
+import gc, io, os, shutil, signal, resource
+import multiprocessing
+from datetime import datetime
+
+# Failure classes recorded in cv_metadata[...]["extraction"]["status"]
+STATUS_OK = "ok"
+STATUS_EMPTY = "empty"
+STATUS_TIMEOUT = "timeout"
+STATUS_MEMORY = "memory_limit"
+STATUS_ENCRYPTED = "encrypted"
+STATUS_MALFORMED = "malformed"
+STATUS_IO_ERROR = "io_error"
+STATUS_ERROR = "extraction_error"
+
+# Failures that will recur for the same bytes under the same limits
+PERMANENT_FAILURES = {STATUS_EMPTY, STATUS_TIMEOUT, STATUS_MEMORY, STATUS_ENCRYPTED, STATUS_MALFORMED}
+
+# Failures the pool itself can cause (a slow spawn, memory held from earlier
+# CVs); a file is only blamed once it fails the same way on a fresh worker
+RETRY_ON_FRESH_WORKER = {STATUS_TIMEOUT, STATUS_MEMORY}
+
+MIN_TEXT_LENGTH = 50
+
+
+class RSSLimitExceeded(MemoryError):
+    """Raised inside a worker when one file grows its resident set past the cap"""
+
+
+class ExtractionTimeout(BaseException):
+    """Raised inside a worker when one file runs past its time budget.
+
+    A BaseException so pypdf's lenient `except Exception` handlers cannot swallow it.
+    """
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+
+def _current_rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak in KB on Linux - close enough off /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _init_worker(max_rss_mb):
+    """Give each worker a hard address-space ceiling as a backstop to the RSS check,
+    and import pypdf before the first task so no file pays for it"""
+    try:
+        limit = max_rss_mb * 4 * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+    import pypdf  # noqa: F401
+
+
+def iter_page_text(reader, max_pages):
+    """Yield the text of each page in turn, stopping at max_pages"""
+    for index, page in enumerate(reader.pages):
+        if index >= max_pages:
+            return
+        yield page.extract_text() or ""
+
+
+def _extract_in_worker(fpath, max_pages, max_rss_mb, max_chars, timeout):
+    """Extract text from one PDF. Runs inside a pool subprocess.
+
+    The time budget starts here, in a warm worker, and the RSS cap applies to
+    what this file adds, not to memory the worker kept from earlier tasks.
+    """
+    import pypdf
+    from pypdf.errors import FileNotDecryptedError, PdfReadError
+
+    result = {
+        "status": STATUS_OK,
+        "text": "",
+        "page_count": 0,
+        "pages_read": 0,
+        "truncated": False,
+        "error": None
+    }
+
+    buffer = io.StringIO()
+    written = 0
+    reader = None
+    baseline_rss_mb = _current_rss_mb()
+    signal.signal(signal.SIGALRM, _raise_timeout)
+
+    try:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        reader = pypdf.PdfReader(fpath)
+
+        if reader.is_encrypted:
+            try:
+                reader.decrypt("")
+            except Exception:
+                pass
+
+        result["page_count"] = len(reader.pages)
+
+        for page_text in iter_page_text(reader, max_pages):
+            result["pages_read"] += 1
+
+            if page_text:
+                remaining = max_chars - written
+                if remaining <= 0:
+                    result["truncated"] = True
+                    break
+                chunk = page_text[:remaining]
+                buffer.write(chunk)
+                buffer.write(" ")
+                written += len(chunk) + 1
+
+            if _current_rss_mb() - baseline_rss_mb > max_rss_mb:
+                raise RSSLimitExceeded(f"RSS grew by more than {max_rss_mb} MB after page {result['pages_read']}")
+
+        if result["page_count"] > max_pages:
+            result["truncated"] = True
+
+        result["text"] = buffer.getvalue().strip()
+
+        if len(result["text"]) < MIN_TEXT_LENGTH:
+            result["status"] = STATUS_EMPTY
+
+    except ExtractionTimeout:
+        result["status"] = STATUS_TIMEOUT
+        result["error"] = f"Extraction exceeded {timeout}s"
+    except MemoryError as e:
+        result["status"] = STATUS_MEMORY
+        result["error"] = str(e) or "MemoryError"
+    except FileNotDecryptedError as e:
+        result["status"] = STATUS_ENCRYPTED
+        result["error"] = str(e)
+    except PdfReadError as e:
+        result["status"] = STATUS_MALFORMED
+        result["error"] = str(e)
+    except OSError as e:
+        result["status"] = STATUS_IO_ERROR
+        result["error"] = str(e)
+    except Exception as e:
+        result["status"] = STATUS_ERROR
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        buffer.close()
+        reader = None
+        gc.collect()
+
+    if result["status"] != STATUS_OK:
+        result["text"] = ""
+
+    return result
+
+
+class CVExtractor:
+    """Runs PDF extraction in recyclable subprocesses with per-file limits.
+
+    The pool is created lazily on first use, so each gunicorn worker gets its
+    own and nothing is spawned at import time. Workers are replaced after
+    `tasks_per_worker` files, and the whole pool is torn down after a timeout
+    or memory failure so a wedged or bloated process never serves another CV.
+    Such a failure is then retried once on the fresh pool before it is
+    reported, since the old worker rather than the file may have caused it.
+
+    `timeout` is enforced inside the worker from the moment a file starts;
+    the parent only gives up after a further `startup_grace` seconds, for
+    workers that are still spawning or too wedged to notice their own timer.
+    """
+
+    def __init__(self, workers=1, timeout=30, max_pages=20, max_rss_mb=512,
+                 max_chars=60000, tasks_per_worker=25, startup_grace=30):
+        self.workers = workers
+        self.timeout = timeout
+        self.startup_grace = startup_grace
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_chars = max_chars
+        self.tasks_per_worker = tasks_per_worker
+        self._pool = None
+        self._owner_pid = None
+
+    def _get_pool(self):
+        if self._pool is None or self._owner_pid != os.getpid():
+            ctx = multiprocessing.get_context('spawn')
+            self._pool = ctx.Pool(
+                processes=self.workers,
+                initializer=_init_worker,
+                initargs=(self.max_rss_mb,),
+                maxtasksperchild=self.tasks_per_worker
+            )
+            self._owner_pid = os.getpid()
+        return self._pool
+
+    def recycle(self):
+        """Kill all workers; a fresh pool is created on the next extraction"""
+        if self._pool is not None and self._owner_pid == os.getpid():
+            self._pool.terminate()
+            self._pool.join()
+        self._pool = None
+        self._owner_pid = None
+
+    def extract(self, fpath):
+        """Extract text from fpath, returning a result dict (never raises)"""
+        result = self._extract_once(fpath)
+        if result["status"] in RETRY_ON_FRESH_WORKER:
+            result = self._extract_once(fpath)
+        return result
+
+    def _extract_once(self, fpath):
+        pool = self._get_pool()
+        task = pool.apply_async(
+            _extract_in_worker,
+            (fpath, self.max_pages, self.max_rss_mb, self.max_chars, self.timeout)
+        )
+
+        try:
+            result = task.get(timeout=self.timeout + self.startup_grace)
+        except multiprocessing.TimeoutError:
+            self.recycle()
+            return {
+                "status": STATUS_TIMEOUT,
+                "text": "",
+                "page_count": 0,
+                "pages_read": 0,
+                "truncated": False,
+                "error": f"Extraction exceeded {self.timeout}s"
+            }
+        except Exception as e:
+            self.recycle()
+            return {
+                "status": STATUS_ERROR,
+                "text": "",
+                "page_count": 0,
+                "pages_read": 0,
+                "truncated": False,
+                "error": f"{type(e).__name__}: {e}"
+            }
+
+        if result["status"] in RETRY_ON_FRESH_WORKER:
+            self.recycle()
+
+        return result
+
+
+def extraction_record(result, f_hash=None):
+    """Metadata summary of an extraction result for cv_metadata (no text)"""
+    return {
+        "status": result["status"],
+        "hash": f_hash,
+        "page_count": result["page_count"],
+        "pages_read": result["pages_read"],
+        "truncated": result["truncated"],
+        "chars": len(result["text"]),
+        "error": result["error"],
+        "extracted_at": datetime.now().isoformat()
+    }
+
+
+class TextCache:
+    """Extracted CV text on disk, keyed by CV hash, so each PDF is parsed once"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, f_hash):
+        return os.path.join(self.root, f_hash[:2], f"{f_hash}.txt")
+
+    def get(self, f_hash):
+        try:
+            with open(self.path_for(f_hash), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, f_hash, text):
+        fpath = self.path_for(f_hash)
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        tmp_path = f"{fpath}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, fpath)
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
@@ -0,0 +1,216 @@
+"""Push-based CV ingestion over IMAP IDLE.
+
+Keeps one authenticated IMAP connection open and waits in IDLE for the server
+to announce new mail, so CVs land in the warehouse within seconds instead of
+whenever someone presses "Sync Inbox Now". New mail is handled by the same
+ingest_unseen() as /sync_email (hashing, dedupe, acknowledgments). Dropped
+connections are re-established with exponential backoff.
+
+With --prewarm, each new CV is also extracted (into the text cache) and scored
+against the active requisition in a background thread, so the work is already
+done when a recruiter runs the analysis. Off by default (including in the
+shipped systemd unit): it spends one LLM call per inbound CV, even on CVs no
+one goes on to screen for that requisition.
+
+    python ingest_daemon.py [--prewarm]
+"""
+import sys, ssl, time, random, select, signal, imaplib, argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app import (
+    create_app, services, get_brevo_api,
+    ingest_unseen, get_cv_text, get_requisition, get_jd_hash, screen_cv,
+    load_data, save_data, session_lock, log_system_event
+)
+
+# Re-issue IDLE well inside the 29 minute limit from RFC 2177; a short cycle
+# also means a missed notification costs at most one cycle.
+IDLE_CYCLE_SECONDS = 300
+BACKOFF_START = 5
+BACKOFF_MAX = 300
+
+
+def connect():
+    config = current_app.config
+    mail = imaplib.IMAP4_SSL(config["IMAP_SERVER"])
+    mail.login(config["IMAP_USER"], config["IMAP_PASSWORD"])
+    mail.select("inbox")
+
+    if 'IDLE' not in mail.capabilities:
+        raise imaplib.IMAP4.error(f"{config['IMAP_SERVER']} does not support IDLE")
+
+    return mail
+
+
+def _has_buffered_input(mail):
+    """True if bytes are already waiting above the raw socket.
+
+    imaplib reads through a buffered file, and TLS decrypts whole records, so
+    a line that arrived together with an earlier one can sit in either buffer
+    while select() on the socket reports nothing to read.
+    """
+    pending = getattr(mail.sock, 'pending', None)
+    if pending and pending():
+        return True
+
+    # peek() serves from the file buffer without consuming it; with the socket
+    # non-blocking it cannot wait when that buffer is empty
+    mail.sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (ssl.SSLWantReadError, BlockingIOError):
+        return False
+    finally:
+        mail.sock.setblocking(True)
+
+
+def idle(mail, timeout):
+    """Wait in IDLE until the server reports new mail or timeout expires.
+
+    Returns True if new mail was announced.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b' IDLE\r\n')
+
+    line = mail.readline()
+    if not line.startswith(b'+'):
+        raise imaplib.IMAP4.abort(f"IDLE rejected: {line!r}")
+
+    new_mail = False
+    deadline = time.monotonic() + timeout
+
+    while not new_mail:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        if not _has_buffered_input(mail):
+            readable, _, _ = select.select([mail.sock], [], [], remaining)
+            if not readable:
+                break
+
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("Connection closed during IDLE")
+        if line.startswith(b'* BYE'):
+            raise imaplib.IMAP4.abort(line.decode(errors='replace').strip())
+        if b'EXISTS' in line or b'RECENT' in line:
+            new_mail = True
+
+    mail.send(b'DONE\r\n')
+
+    # Drain untagged responses until IDLE is acknowledged
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("Connection closed ending IDLE")
+        if line.startswith(tag):
+            break
+        if b'EXISTS' in line or b'RECENT' in line:
+            new_mail = True
+
+    return new_mail
+
+
+def prewarm(app, fpath, f_hash):
+    """Extract a new CV and score it against the active requisition"""
+    with app.app_context():
+        _prewarm(fpath, f_hash)
+
+
+def _prewarm(fpath, f_hash):
+    try:
+        scratch = {"cv_metadata": {}}
+        cv_text = get_cv_text(scratch, fpath, f_hash)
+
+        analysis = None
+        data = load_data()
+        requisition = get_requisition(data)
+
+        if cv_text and requisition and requisition.get("jd"):
+            cache_key = f"{f_hash}:{get_jd_hash(requisition['jd'])}"
+            if services().score_cache.get(cache_key) is None:
+                analysis, used_llm = screen_cv(scratch, requisition["jd"], fpath, cv_text)
+                if used_llm:
+                    services().score_cache.put(cache_key, analysis)
+
+        with session_lock():
+            data = load_data()
+            for path, meta in scratch["cv_metadata"].items():
+                data["cv_metadata"].setdefault(path, {}).update(meta)
+            save_data(data)
+
+        print(f"PREWARMED {f_hash[:12]}: text={'yes' if cv_text else 'no'} scored={'yes' if analysis else 'no'}")
+
+    except Exception as e:
+        print(f"Prewarm failed for {f_hash[:12]}: {e}")
+
+
+def run(prewarm_enabled=False):
+    """Listen forever; call inside an app context"""
+    app = current_app._get_current_object()
+    config = app.config
+    api_instance = get_brevo_api()
+    pool = ThreadPoolExecutor(max_workers=1) if prewarm_enabled else None
+    backoff = BACKOFF_START
+
+    while True:
+        mail = None
+        try:
+            mail = connect()
+            print(f"IDLE listener connected to {config['IMAP_SERVER']}")
+            log_system_event("IMAP_IDLE_CONNECTED", f"Listening on {config['IMAP_USER']}")
+            backoff = BACKOFF_START
+
+            # Catch anything that arrived while we were disconnected, then wait
+            while True:
+                result = ingest_unseen(mail, api_instance)
+
+                if result["new_cvs"]:
+                    log_system_event("EMAIL_SYNC", f"Synced {result['new_cvs']} CVs, sent {result['acknowledgments_sent']} acknowledgments", {"via": "idle"})
+                    if pool:
+                        for fpath, f_hash in result["stored"]:
+                            pool.submit(prewarm, app, fpath, f_hash)
+
+                idle(mail, IDLE_CYCLE_SECONDS)
+
+        except (imaplib.IMAP4.error, OSError, RuntimeError) as e:
+            delay = backoff + random.uniform(0, backoff / 2)
+            print(f"IMAP connection lost ({e}); reconnecting in {delay:.0f}s")
+            log_system_event("ERROR", "IMAP IDLE connection lost", {"error": str(e), "retry_in": round(delay)})
+            time.sleep(delay)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+        finally:
+            if mail is not None:
+                try:
+                    mail.logout()
+                except Exception:
+                    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TalentScope IMAP IDLE ingestion daemon")
+    parser.add_argument('--prewarm', action='store_true', help="Extract and pre-score new CVs as they arrive")
+    args = parser.parse_args()
+
+    app = create_app()
+    if not app.config["IMAP_PASSWORD"]:
+        print("IMAP not configured (IMAP_PASSWORD is empty)")
+        return 1
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    with app.app_context():
+        try:
+            run(prewarm_enabled=args.prewarm)
+        finally:
+            services().extractor.recycle()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
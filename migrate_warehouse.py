@@ -0,0 +1,94 @@
+"""Move the flat CV warehouse into the sharded content-addressed layout.
+
+Usage (on the node, with the service's .env available):
+
+    python migrate_warehouse.py            # migrate
+    python migrate_warehouse.py --dry-run  # report what would move
+
+Every PDF directly inside UPLOAD_FOLDER is moved to ab/cd/<sha256>.pdf, its
+old filename is kept as an alias so /download_cv links still resolve, and the
+session data and catalogue are rewritten to point at the new paths.
+
+The move runs under the session lock, so it is safe with the service and the
+ingest daemon running: uploads, recruiter edits and email CVs wait for it
+instead of being overwritten when the rewritten session is saved.
+"""
+import os, sys, argparse
+
+from app import create_app, services, load_data, save_data, session_lock, log_system_event
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help="List flat CVs without moving them")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        return migrate(app, args.dry_run)
+
+
+def migrate(app, dry_run):
+    upload_folder = app.config['UPLOAD_FOLDER']
+    flat_cvs = [
+        entry.path for entry in os.scandir(upload_folder)
+        if entry.is_file() and entry.name.lower().endswith('.pdf')
+    ]
+
+    print(f"{len(flat_cvs)} flat CVs in {upload_folder}")
+    if dry_run or not flat_cvs:
+        return 0
+
+    with session_lock():
+        moved, report = _migrate_locked(upload_folder)
+
+    unique = len({f_hash for _, f_hash in moved.values()})
+    log_system_event("WAREHOUSE_MIGRATED", f"Moved {len(moved)} CVs into {unique} sharded files")
+    print(f"Moved {len(moved)} CVs into {unique} sharded files; catalogue holds {report['on_disk']}")
+    return 0
+
+
+def _migrate_locked(upload_folder):
+    """Move the flat CVs and rewrite session data and catalogue. Caller holds the session lock."""
+    catalogue = services().catalogue
+    cv_store = services().cv_store
+
+    data = load_data()
+    cv_metadata = data.get("cv_metadata", {})
+    original_names = {
+        path: meta.get("original_filename", os.path.basename(path))
+        for path, meta in cv_metadata.items()
+    }
+
+    moved = cv_store.migrate_flat(upload_folder, original_names)
+
+    # Re-key session data onto the new paths
+    new_metadata = {}
+    for path, meta in cv_metadata.items():
+        new_path = moved.get(path, (path, None))[0]
+        new_metadata.setdefault(new_path, meta)
+    data["cv_metadata"] = new_metadata
+
+    for old_path, (new_path, f_hash) in moved.items():
+        data.setdefault("hashes", {})[f_hash] = new_path
+        new_metadata.setdefault(new_path, {
+            "original_filename": os.path.basename(old_path),
+            "hash": f_hash,
+            "source": "unknown"
+        })
+
+    renamed = {os.path.basename(old): (os.path.basename(new), f_hash) for old, (new, f_hash) in moved.items()}
+    for requisition in data["requisitions"].values():
+        for candidate in requisition.get("candidates", []):
+            if candidate.get("cv_filename") in renamed:
+                candidate["cv_filename"], candidate["cv_hash"] = renamed[candidate["cv_filename"]]
+
+    save_data(data)
+
+    catalogue.clear()
+    report = catalogue.reconcile(repair=True, metadata=new_metadata)
+    return moved, report
+
+
+if __name__ == '__main__':
+    sys.exit(main())
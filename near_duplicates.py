@@ -0,0 +1,229 @@
+"""Near-duplicate detection across CV versions.
+
+Candidates often send several slightly different PDFs (a fixed typo, a new
+job added), each with its own SHA-256. Every CV gets a MinHash signature over
+word shingles of its extracted text; an LSH index over signature bands finds
+earlier versions without comparing against the whole warehouse. Versions that
+are textually close, or that share a contact email and are still fairly
+similar, are grouped under one person id so only the newest version needs
+scoring.
+
+The index is an append-only JSON-lines log (one line per CV, one per merge of
+two people). Each process replays it once and afterwards only reads the lines
+other processes appended, so a run parses and writes just the CVs it adds.
+"""
+import os, re, json, fcntl, random, hashlib
+from contextlib import contextmanager
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+
+# Estimated Jaccard similarity at or above which two CVs are the same person
+SIMILARITY_THRESHOLD = 0.8
+
+# Lower bar when both CVs also carry the same email. An email alone is not
+# enough: agency headers, shared recruiter inboxes and referees repeat across
+# unrelated candidates.
+EMAIL_SIMILARITY_THRESHOLD = 0.5
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+_WORD_RE = re.compile(r'\w+')
+
+
+def extract_email(text):
+    """First email address in the text (the contact block heads most CVs), lowercased"""
+    match = EMAIL_RE.search(text or "")
+    return match.group(0).lower().rstrip('.') if match else None
+
+
+def shingles(text):
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(text):
+    """MinHash signature (NUM_PERM ints) of the text's word shingles"""
+    hashed = [
+        int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+        for s in shingles(text)
+    ]
+    if not hashed:
+        return [_MAX_HASH] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashed) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _band_keys(signature):
+    return [
+        f"{band}:" + hashlib.md5(",".join(map(str, signature[band * ROWS:(band + 1) * ROWS])).encode()).hexdigest()[:16]
+        for band in range(BANDS)
+    ]
+
+
+class PersonIndex:
+    """Persistent MinHash/LSH index mapping CV hashes to person ids"""
+
+    def __init__(self, path):
+        self.path = path
+        self._reset(None)
+
+    def _reset(self, file_id):
+        self.entries = {}
+        self.members = {}
+        self.buckets = {}
+        self.by_email = {}
+        self._file_id = file_id
+        self._offset = 0
+
+    @contextmanager
+    def _lock(self):
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Apply log lines appended since the last read. Caller holds the lock."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset(None)
+            return
+
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self._file_id or stat.st_size < self._offset:
+            # Cleared (replaced) since we last read it: replay from the start
+            self._reset(file_id)
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Tail of a writer that died mid-append; the next append overwrites it
+                    break
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    pass
+                self._offset += len(line)
+
+    def _apply(self, record):
+        if "merge" in record:
+            person_id = record["person_id"]
+            for other in record["merge"]:
+                for f_hash in self.members.pop(other, set()):
+                    self.entries[f_hash]["person_id"] = person_id
+                    self.members.setdefault(person_id, set()).add(f_hash)
+            return
+
+        f_hash = record["hash"]
+        self.entries[f_hash] = record
+        self.members.setdefault(record["person_id"], set()).add(f_hash)
+        for key in record["bands"]:
+            self.buckets.setdefault(key, []).append(f_hash)
+        if record.get("email"):
+            self.by_email.setdefault(record["email"], []).append(f_hash)
+
+    def _persist(self, records):
+        """Append records, already applied in memory, to the log. Caller holds the lock and has refreshed."""
+        lines = b"".join(json.dumps(record, separators=(',', ':')).encode('utf-8') + b"\n" for record in records)
+        open(self.path, 'ab').close()
+        with open(self.path, 'r+b') as f:
+            # Drop the torn tail of a writer that died mid-append, if any
+            f.truncate(self._offset)
+            f.seek(self._offset)
+            f.write(lines)
+            stat = os.fstat(f.fileno())
+
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self._offset += len(lines)
+
+    def _place(self, f_hash, signature, email):
+        """Log records that add one CV to the index.
+
+        A close textual match for two existing people merges them into one; a
+        weaker match backed by the same email joins the most similar person but
+        never merges people.
+        """
+        keys = _band_keys(signature)
+
+        close = set()
+        for key in keys:
+            for other in self.buckets.get(key, []):
+                if other not in close and similarity(signature, self.entries[other]["signature"]) >= SIMILARITY_THRESHOLD:
+                    close.add(other)
+
+        email_matches = [
+            (similarity(signature, self.entries[other]["signature"]), other)
+            for other in self.by_email.get(email, []) if other not in close
+        ] if email else []
+        email_matches = [match for match in email_matches if match[0] >= EMAIL_SIMILARITY_THRESHOLD]
+
+        records = []
+        people = sorted({self.entries[other]["person_id"] for other in close})
+        if people:
+            person_id = people[0]
+            # Only a close textual match may bridge people we had kept apart
+            if len(people) > 1:
+                records.append({"merge": people[1:], "person_id": person_id})
+        elif email_matches:
+            person_id = self.entries[max(email_matches)[1]]["person_id"]
+        else:
+            person_id = f"person_{f_hash[:12]}"
+
+        records.append({"hash": f_hash, "signature": signature, "email": email, "bands": keys, "person_id": person_id})
+        return records
+
+    def known(self):
+        """Hashes that already have a signature"""
+        with self._lock():
+            self._refresh()
+            return set(self.entries)
+
+    def assign(self, texts):
+        """Index {f_hash: text} and return {f_hash: person_id} for those hashes.
+
+        Hashes already indexed keep their signature and may be passed with a
+        text of None.
+        """
+        with self._lock():
+            self._refresh()
+
+            records = []
+            for f_hash, text in texts.items():
+                if f_hash in self.entries or text is None:
+                    continue
+                # Placed one at a time so later CVs in the batch can match earlier ones
+                placed = self._place(f_hash, minhash(text), extract_email(text))
+                records += [dict(record) for record in placed]
+                for record in placed:
+                    self._apply(record)
+
+            if records:
+                self._persist(records)
+
+            return {f_hash: self.entries[f_hash]["person_id"] for f_hash in texts if f_hash in self.entries}
+
+    def clear(self):
+        with self._lock():
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            open(tmp_path, 'wb').close()
+            os.replace(tmp_path, self.path)
+            self._reset(None)
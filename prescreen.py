@@ -0,0 +1,182 @@
+"""Local pre-extraction of compliance fields from CV text.
+
+Right to work, GMC/NMC registrations, DBS and the contact email are pulled out
+with one pass of a combined keyword pattern plus a few compiled regexes, so
+the LLM gets them as compact hints instead of hunting for them in the full CV,
+and clear-cut rejections never reach it at all.
+"""
+import re
+
+from near_duplicates import extract_email
+
+# Bump when the rules change so cached results are recomputed
+PRESCREEN_VERSION = 1
+
+KEYWORDS = {
+    "rtw_yes": [
+        "british citizen", "british national", "british passport", "uk citizen",
+        "irish citizen", "indefinite leave to remain", "ilr", "settled status",
+        "eu settlement scheme", "full right to work in the uk", "full uk right to work",
+        "right to work in the uk", "eligible to work in the uk", "no sponsorship required",
+        "do not require sponsorship", "does not require sponsorship", "without sponsorship"
+    ],
+    "rtw_limited": [
+        "pre-settled status", "graduate visa", "graduate route", "student visa",
+        "tier 4", "dependant visa", "dependent visa", "youth mobility"
+    ],
+    "rtw_sponsorship": [
+        "require sponsorship", "requires sponsorship", "require visa sponsorship",
+        "requires visa sponsorship", "need sponsorship", "needs sponsorship",
+        "seeking sponsorship", "seeking visa sponsorship", "sponsorship required",
+        "visa sponsorship required", "require a skilled worker visa",
+        "requires a skilled worker visa", "certificate of sponsorship required"
+    ],
+    "dbs_enhanced": ["enhanced dbs", "enhanced disclosure", "enhanced crb"],
+    "dbs_standard": ["standard dbs", "standard disclosure"],
+    "dbs_basic": ["basic dbs", "basic disclosure"],
+    "dbs": ["dbs", "crb check", "disclosure and barring"],
+    "dbs_update_service": ["dbs update service", "update service"]
+}
+
+JD_NO_SPONSORSHIP = [
+    "no sponsorship", "unable to offer sponsorship", "unable to sponsor", "cannot sponsor",
+    "can not sponsor", "cannot offer sponsorship", "sponsorship is not available",
+    "sponsorship not available", "not able to sponsor", "we do not sponsor",
+    "does not offer sponsorship", "do not offer sponsorship"
+]
+
+
+def _keyword_pattern(phrases):
+    """One alternation over every phrase, longest first.
+
+    Alternatives are tried in order at each position, so listing longer
+    phrases first makes a single pass leftmost-longest: "no sponsorship
+    required" is never also counted as "sponsorship required".
+    """
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    body = "|".join(r'\s+'.join(map(re.escape, phrase.split())) for phrase in ordered)
+    return re.compile(rf"\b(?:{body})\b", re.IGNORECASE)
+
+
+_KEYWORD_GROUPS = {phrase: name for name, phrases in KEYWORDS.items() for phrase in phrases}
+_CV_KEYWORDS = _keyword_pattern(_KEYWORD_GROUPS)
+_JD_NO_SPONSORSHIP = _keyword_pattern(JD_NO_SPONSORSHIP)
+
+GMC_RE = re.compile(r'\bGMC\b[^\n\d]{0,40}?(\d{7})\b', re.IGNORECASE)
+NMC_RE = re.compile(r'\b(?i:NMC|PIN)\b[^\n]{0,40}?\b(\d{2}[A-Z]\d{4}[A-Z])\b')
+# "not", "no longer", "never", "don't", "won't"... shortly before a phrase reverses it
+NEGATION_RE = re.compile(r"\b(?:not|no|never|without|cannot)\b|n['\u2019]t\b", re.IGNORECASE)
+NEGATION_WINDOW_WORDS = 4
+# So does a form-style answer straight after it: "Sponsorship required: No", "Require sponsorship? N/A"
+ANSWERED_NO_RE = re.compile(
+    r"\s*[:?\-\u2013\u2014=]*\s*\(?(?:no|none|nil|n/?a|not (?:applicable|required|needed))\b",
+    re.IGNORECASE
+)
+# Only a first-person statement is clear enough to reject on: "I require sponsorship",
+# "I will need visa sponsorship". Bare phrases are often form labels whose answer is elsewhere.
+FIRST_PERSON_RE = re.compile(
+    r"\bI(?:['\u2019](?:ll|d|m))?(?:\s+(?:will|would|shall|do|am|currently|still|also|now|therefore))*\s+$",
+    re.IGNORECASE
+)
+RTW_GROUPS = ("rtw_yes", "rtw_limited", "rtw_sponsorship")
+
+_WHITESPACE_RE = re.compile(r'[ \t\r\f\v]+')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n+')
+
+
+def compact_text(text):
+    """Collapse runs of spaces and blank lines (PDF extraction is full of them)"""
+    text = _WHITESPACE_RE.sub(' ', text or "")
+    return _BLANK_LINES_RE.sub('\n', text).strip()
+
+
+def _negated(text, match):
+    """True if a few words before the match, or an answer right after it, negate it"""
+    preceding = text[max(0, match.start() - 60):match.start()].split()[-NEGATION_WINDOW_WORDS:]
+    return bool(NEGATION_RE.search(" ".join(preceding)) or ANSWERED_NO_RE.match(text, match.end()))
+
+
+def _first_person(text, match):
+    return bool(FIRST_PERSON_RE.search(text[max(0, match.start() - 40):match.start()]))
+
+
+def _first_keyword_hits(text):
+    """First phrase found per keyword group, right-to-work phrases that were negated,
+    and whether a sponsorship phrase was stated in the first person"""
+    hits = {}
+    negated = []
+    stated = False
+    for match in _CV_KEYWORDS.finditer(text):
+        phrase = " ".join(match.group(0).lower().split())
+        group = _KEYWORD_GROUPS[phrase]
+        if group in RTW_GROUPS and _negated(text, match):
+            negated.append(phrase)
+            continue
+        hits.setdefault(group, phrase)
+        stated = stated or (group == "rtw_sponsorship" and _first_person(text, match))
+    return hits, negated, stated
+
+
+def prescreen(text):
+    """Compliance fields found in a CV's text"""
+    text = text or ""
+    hits, negated, stated = _first_keyword_hits(text)
+
+    if "rtw_yes" in hits:
+        rtw = "yes"
+    elif "rtw_sponsorship" in hits:
+        rtw = "needs_sponsorship"
+    elif "rtw_limited" in hits:
+        rtw = "time_limited"
+    else:
+        rtw = "unknown"
+
+    dbs = None
+    for level in ("enhanced", "standard", "basic"):
+        if f"dbs_{level}" in hits:
+            dbs = level
+            break
+    if dbs is None and ("dbs" in hits or "dbs_update_service" in hits):
+        dbs = "mentioned"
+
+    gmc = GMC_RE.search(text)
+    nmc = NMC_RE.search(text)
+
+    return {
+        "version": PRESCREEN_VERSION,
+        "rtw": rtw,
+        "rtw_evidence": hits.get("rtw_yes") or hits.get("rtw_sponsorship") or hits.get("rtw_limited"),
+        "rtw_negated": negated,
+        "sponsorship_stated": stated,
+        "gmc_number": gmc.group(1) if gmc else None,
+        "nmc_pin": nmc.group(1) if nmc else None,
+        "dbs": dbs,
+        "dbs_update_service": "dbs_update_service" in hits,
+        "email": extract_email(text)
+    }
+
+
+def jd_excludes_sponsorship(jd):
+    return bool(_JD_NO_SPONSORSHIP.search(jd or ""))
+
+
+def rejection_reason(fields, jd):
+    """Why a CV can be rejected without the LLM, or None when it needs scoring.
+
+    Only unambiguous cases: the candidate says in the first person that they
+    need sponsorship ("I require visa sponsorship"), shows no right-to-work
+    evidence, negates or answers "no" to no right-to-work phrase anywhere, and
+    the JD says sponsorship is not offered.
+    """
+    if (fields.get("rtw") == "needs_sponsorship" and fields.get("sponsorship_stated")
+            and not fields.get("rtw_negated") and jd_excludes_sponsorship(jd)):
+        return f"Requires visa sponsorship (\"{fields.get('rtw_evidence')}\"); role does not offer sponsorship"
+    return None
+
+
+def hints(fields):
+    """Compact hint dict for the prompt, without empty fields"""
+    return {
+        key: value for key, value in fields.items()
+        if key not in ("version", "rtw_evidence", "rtw_negated", "sponsorship_stated") and value not in (None, False, "unknown", [])
+    }
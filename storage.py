@@ -0,0 +1,172 @@
+"""Content-addressed CV storage.
+
+Each CV is stored once under a path derived from its SHA-256, sharded two
+levels deep (`ab/cd/<sha256>.pdf`) so no directory grows without limit and a
+duplicate upload is detected by the file already being there. Legacy flat
+filenames live in a small alias table so existing download links keep
+working; original upload names are kept per hash only as download names.
+"""
+import os, re, json, fcntl, shutil, hashlib
+from contextlib import contextmanager
+
+HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def shard_path(f_hash):
+    """Relative sharded path for a CV hash"""
+    return os.path.join(f_hash[:2], f_hash[2:4], f"{f_hash}.pdf")
+
+
+class CVStore:
+    """Stores CV bytes under their hash, with an alias table for filenames"""
+
+    def __init__(self, root, alias_file):
+        self.root = os.path.abspath(root)
+        self.alias_file = alias_file
+
+    def path_for(self, f_hash):
+        return os.path.join(self.root, shard_path(f_hash))
+
+    def put(self, file_bytes, f_hash=None):
+        """Store bytes under their hash. Returns (path, created)."""
+        f_hash = f_hash or hashlib.sha256(file_bytes).hexdigest()
+        fpath = self.path_for(f_hash)
+
+        if os.path.exists(fpath):
+            return fpath, False
+
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        tmp_path = f"{fpath}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(file_bytes)
+        os.replace(tmp_path, fpath)
+
+        return fpath, True
+
+    def prune_empty_shards(self):
+        """Remove shard directories left empty after deletions"""
+        for dirpath, _, _ in os.walk(self.root, topdown=False):
+            if dirpath != self.root and not os.listdir(dirpath):
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
+
+    @contextmanager
+    def _aliases(self, write=False):
+        """Yield the alias table, saving it afterwards if write=True"""
+        with open(self.alias_file + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+            try:
+                table = {"aliases": {}, "names": {}}
+                if os.path.exists(self.alias_file):
+                    try:
+                        with open(self.alias_file, 'r', encoding='utf-8') as f:
+                            table = json.load(f)
+                    except ValueError:
+                        pass
+
+                yield table
+
+                if write:
+                    tmp_path = self.alias_file + '.tmp'
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(table, f, indent=2, ensure_ascii=False)
+                    os.replace(tmp_path, self.alias_file)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def set_name(self, f_hash, original_name):
+        """Remember the name a CV was first uploaded under, for downloads"""
+        with self._aliases(write=True) as table:
+            table["names"].setdefault(f_hash, original_name)
+
+    def add_alias(self, alias, f_hash, original_name=None):
+        """Map a legacy flat filename to a stored hash.
+
+        Only migrated filenames are aliased: they were unique per upload,
+        whereas original names like CV.pdf are shared between candidates.
+        """
+        with self._aliases(write=True) as table:
+            table["aliases"][os.path.basename(alias)] = f_hash
+            if original_name:
+                table["names"].setdefault(f_hash, original_name)
+
+    def clear_aliases(self):
+        with self._aliases(write=True) as table:
+            table["aliases"] = {}
+            table["names"] = {}
+
+    def resolve(self, filename):
+        """Return (path, download_name) for a hash name or alias, or (None, None)"""
+        name = os.path.basename(filename)
+        stem = name[:-4] if name.lower().endswith('.pdf') else name
+
+        with self._aliases() as table:
+            f_hash = stem if HASH_RE.match(stem) else table["aliases"].get(name)
+            if not f_hash:
+                return None, None
+            download_name = table["names"].get(f_hash, name)
+
+        fpath = self.path_for(f_hash)
+        if not os.path.exists(fpath):
+            return None, None
+        return fpath, download_name
+
+    def migrate_flat(self, flat_dir, original_names=None):
+        """Move every PDF directly inside flat_dir into the sharded layout.
+
+        Returns {old_path: (new_path, hash)}. Byte-identical duplicates
+        collapse onto a single stored file.
+        """
+        original_names = original_names or {}
+        moved = {}
+
+        for entry in sorted(os.scandir(flat_dir), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.lower().endswith('.pdf'):
+                continue
+
+            with open(entry.path, 'rb') as f:
+                file_bytes = f.read()
+
+            f_hash = hashlib.sha256(file_bytes).hexdigest()
+            fpath, _ = self.put(file_bytes, f_hash)
+            self.add_alias(entry.name, f_hash, original_names.get(entry.path, entry.name))
+            os.remove(entry.path)
+
+            moved[entry.path] = (fpath, f_hash)
+
+        return moved
+
+
+class ScoreCache:
+    """LLM analyses on disk, one JSON file per "<cv_hash>:<jd_hash>" key.
+
+    Kept out of the session file, which is rewritten on every recruiter edit.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, key):
+        cv_hash, jd_hash = key.split(':', 1)
+        return os.path.join(self.root, cv_hash[:2], f"{cv_hash}_{jd_hash}.json")
+
+    def get(self, key):
+        try:
+            with open(self.path_for(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key, analysis):
+        fpath = self.path_for(key)
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        tmp_path = f"{fpath}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(analysis, f, ensure_ascii=False)
+        os.replace(tmp_path, fpath)
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
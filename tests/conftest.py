@@ -0,0 +1,23 @@
+import os, sys
+
+import pytest
+
+# The app is a flat set of modules, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App with every folder under tmp_path, inside an app context"""
+    import app as talentscope
+
+    monkeypatch.setenv("TALENTSCOPE_ROOT", str(tmp_path))
+    application = talentscope.create_app()
+    with application.app_context():
+        yield application
+    application.extensions["talentscope"].extractor.recycle()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,133 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+import app as talentscope
+
+NURSE_JD = "Staff Nurse\nAcute medical ward, band 5. We are unable to offer sponsorship."
+PHARMACIST_JD = "Pharmacist\nHospital dispensary, band 6."
+
+
+def cv_text(name, extra=""):
+    # Distinct vocabulary per candidate so CV versions are never grouped together
+    return f"{name} {name.lower()}@example.com {extra} " + " ".join(f"{name.lower()}{i}" for i in range(60))
+
+
+@pytest.fixture
+def llm(app, monkeypatch):
+    """Fake scorer: each CV's text names the candidate; records every call"""
+    texts = {}
+    calls = []
+
+    def fake_text(data, fpath, f_hash, retry_failed=False):
+        return texts.get(f_hash)
+
+    def fake_score(jd, text, cv_hints=None):
+        calls.append(text.split()[0])
+        name, email = text.split()[:2]
+        return {"candidate_name": name, "email": email, "score": 70, "summary": "", "dismissed": False}
+
+    monkeypatch.setattr(talentscope, "get_cv_text", fake_text)
+    monkeypatch.setattr(talentscope, "score_cv", fake_score)
+    return texts, calls
+
+
+def upload(client, llm, names, jd=NURSE_JD, extra="", **form):
+    texts, _ = llm
+    files = []
+    for name in names:
+        text = cv_text(name, extra)
+        texts[talentscope.get_file_hash(text.encode())] = text
+        files.append((io.BytesIO(text.encode()), f"{name}.pdf"))
+    return client.post('/analyze_tribunal', data={"full_jd": jd, "files": files, **form},
+                       content_type='multipart/form-data')
+
+
+def by_name(candidates):
+    return {c["candidate_name"]: c for c in candidates}
+
+
+def test_upload_adds_to_the_ranking_and_keeps_decisions(client, llm):
+    alice = upload(client, llm, ["Alice"]).json[0]
+    requisition_id = alice["requisition_id"]
+    client.post('/update_candidate', json={
+        "cv_hash": alice["cv_hash"], "status": "Interview", "notes": "great", "requisition_id": requisition_id
+    })
+
+    ranking = upload(client, llm, ["Bob"], requisition_id=requisition_id).json
+
+    assert set(by_name(ranking)) == {"Alice", "Bob"}
+    assert by_name(ranking)["Alice"]["status"] == "Interview"
+    assert by_name(ranking)["Alice"]["notes"] == "great"
+    assert talentscope.requisition_candidates(talentscope.load_data(), requisition_id) == ranking
+
+    ranking = client.post('/analyze_tribunal', data={
+        "full_jd": NURSE_JD, "mode": "warehouse", "requisition_id": requisition_id
+    }).json
+    assert set(by_name(ranking)) == {"Alice", "Bob"}
+    assert by_name(ranking)["Alice"]["status"] == "Interview"
+
+
+def test_reupload_replaces_only_that_candidate(client, llm):
+    _, calls = llm
+    first = upload(client, llm, ["Alice", "Bob"]).json
+    ranking = upload(client, llm, ["Bob"], requisition_id=first[0]["requisition_id"]).json
+    assert sorted(c["candidate_name"] for c in ranking) == ["Alice", "Bob"]
+    # Bob's CV was already scored against this JD
+    assert calls == ["Alice", "Bob"]
+
+
+def test_other_jd_does_not_take_over_a_requisition(client, llm):
+    nurse = upload(client, llm, ["Alice"]).json[0]["requisition_id"]
+
+    response = upload(client, llm, ["Bob"], jd=PHARMACIST_JD, requisition_id=nurse)
+    assert response.status_code == 409
+    assert response.json["jd_changed"] is True
+    assert response.json["title"] == "Staff Nurse"
+    requisition = talentscope.get_requisition(talentscope.load_data(), nurse)
+    assert requisition["jd"] == NURSE_JD
+    assert [c["candidate_name"] for c in requisition["candidates"]] == ["Alice"]
+
+    # Without the requisition id the JD gets a requisition of its own
+    pharmacist = upload(client, llm, ["Bob"], jd=PHARMACIST_JD).json[0]["requisition_id"]
+    assert pharmacist != nurse
+
+    # With update_jd the recruiter has confirmed the change
+    response = upload(client, llm, ["Carol"], jd=PHARMACIST_JD, requisition_id=nurse, update_jd='true')
+    assert response.status_code == 200
+    assert talentscope.get_requisition(talentscope.load_data(), nurse)["jd"] == PHARMACIST_JD
+
+
+def test_whitespace_changes_keep_the_requisition(client, llm):
+    nurse = upload(client, llm, ["Alice"]).json[0]["requisition_id"]
+    response = upload(client, llm, ["Bob"], jd=NURSE_JD.replace("\n", "\n\n  "), requisition_id=nurse)
+    assert response.status_code == 200
+    assert {c["requisition_id"] for c in response.json} == {nurse}
+
+
+def test_prescreen_rejections_are_ranked_but_not_cached_or_emailed(app, client, llm, monkeypatch):
+    _, calls = llm
+    upload(client, llm, ["Alice"])
+    ranking = upload(client, llm, ["Raj"], extra="I require visa sponsorship.",
+                     requisition_id=f"req_{talentscope.get_jd_hash(NURSE_JD)[:12]}").json
+
+    raj = by_name(ranking)["raj@example.com"]
+    assert raj["score"] == 0
+    assert raj["prescreen_rejection"].startswith("Requires visa sponsorship")
+    assert calls == ["Alice"]
+    assert talentscope.services().score_cache.get(f"{raj['cv_hash']}:{talentscope.get_jd_hash(NURSE_JD)}") is None
+
+    sent = []
+    monkeypatch.setattr(talentscope, "get_openai_client", lambda: None)
+    monkeypatch.setattr(talentscope, "get_brevo_sdk", lambda: SimpleNamespace(SendSmtpEmail=lambda **kwargs: kwargs))
+    monkeypatch.setattr(talentscope, "get_brevo_api", lambda: SimpleNamespace(send_transac_email=sent.append))
+
+    preview = client.post('/bulk_decision', json={"threshold": 65, "preview_only": True}).json
+    assert preview["held"] == ["raj@example.com"]
+    assert list(preview["preview_messages"]) == ["Alice"]
+
+    result = client.post('/bulk_decision', json={"threshold": 65, "preview_only": False}).json
+    assert result["held"] == ["raj@example.com"]
+    assert result["regrets"] == []
+    assert [email["to"][0]["email"] for email in sent] == ["alice@example.com"]
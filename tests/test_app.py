@@ -0,0 +1,19 @@
+import os
+
+import app as talentscope
+
+
+def test_clear_memory_deletes_untracked_pdfs(app, client):
+    data = talentscope.empty_data()
+    fpath, _, _ = talentscope.store_cv(data, b"%PDF catalogued", "cv.pdf", "manual")
+    talentscope.save_data(data)
+    stray = os.path.join(app.config['UPLOAD_FOLDER'], "dropped-in-by-hand.pdf")
+    with open(stray, 'wb') as f:
+        f.write(b"%PDF stray")
+
+    response = client.post('/clear_memory')
+
+    assert response.json == {"status": "success", "cvs_deleted": 2}
+    assert not os.path.exists(fpath)
+    assert not os.path.exists(stray)
+    assert talentscope.services().catalogue.reconcile()["untracked"] == []
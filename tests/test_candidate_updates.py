@@ -0,0 +1,133 @@
+import pytest
+
+import app as talentscope
+from app import parse_candidate_updates, apply_candidate_updates
+
+
+def ranking():
+    return [
+        {"candidate_name": "Alice", "cv_hash": "a" * 64, "status": "Applied", "notes": "", "version": 0},
+        {"candidate_name": "Bob", "cv_hash": "b" * 64, "status": "Applied", "notes": "", "version": 3},
+        {"candidate_name": "Bob", "cv_filename": "legacy.pdf", "status": "Applied", "notes": "", "version": 0}
+    ]
+
+
+def test_parse_accepts_hash_or_name_and_casts_version():
+    updates = parse_candidate_updates([
+        {"cv_hash": "a" * 64, "status": "Screened", "version": "2"},
+        {"candidate_name": "Bob", "notes": "call back"}
+    ])
+    assert updates[0]["version"] == 2
+    assert updates[1] == {"candidate_name": "Bob", "notes": "call back"}
+
+
+@pytest.mark.parametrize("updates", [
+    {"cv_hash": "a" * 64},
+    ["not a dict"],
+    [{"status": "Screened"}],
+    [{"cv_hash": "a" * 64, "version": "abc"}],
+    [{"candidate_name": "Bob", "version": [1]}]
+])
+def test_parse_rejects_malformed(updates):
+    with pytest.raises(ValueError):
+        parse_candidate_updates(updates)
+
+
+def test_apply_by_hash_bumps_versions():
+    candidates = ranking()
+    applied, conflicts, missing = apply_candidate_updates(candidates, parse_candidate_updates([
+        {"cv_hash": "b" * 64, "status": "Interviewed", "version": 3},
+        {"cv_hash": "legacy.pdf", "notes": "no hash yet"}
+    ]))
+
+    assert conflicts == [] and missing == []
+    assert applied == [
+        {"cv_hash": "b" * 64, "candidate_name": "Bob", "version": 4, "status": "Interviewed"},
+        {"cv_hash": "legacy.pdf", "candidate_name": "Bob", "version": 1, "status": "Applied"}
+    ]
+    assert candidates[2]["notes"] == "no hash yet"
+
+
+def test_apply_by_name_uses_first_match():
+    candidates = ranking()
+    applied, _, _ = apply_candidate_updates(candidates, parse_candidate_updates([
+        {"candidate_name": "Bob", "status": "Rejected"}
+    ]))
+    assert applied[0]["cv_hash"] == "b" * 64
+    assert [c["status"] for c in candidates] == ["Applied", "Rejected", "Applied"]
+
+
+def test_apply_is_all_or_nothing():
+    candidates = ranking()
+    applied, conflicts, missing = apply_candidate_updates(candidates, parse_candidate_updates([
+        {"cv_hash": "a" * 64, "status": "Screened", "version": 0},
+        {"cv_hash": "b" * 64, "status": "Screened", "version": 1},
+        {"cv_hash": "c" * 64, "status": "Screened"}
+    ]))
+
+    assert applied == []
+    assert conflicts == [{
+        "cv_hash": "b" * 64,
+        "candidate_name": "Bob",
+        "expected_version": 1,
+        "current_version": 3,
+        "status": "Applied",
+        "notes": ""
+    }]
+    assert missing == ["c" * 64]
+    assert candidates == ranking()
+
+
+@pytest.fixture
+def saved_ranking(app):
+    data = talentscope.empty_data()
+    data["requisitions"]["req_1"] = {"id": "req_1", "title": "Nurse", "jd": "", "candidates": ranking()}
+    data["active_requisition"] = "req_1"
+    talentscope.save_data(data)
+
+
+def saved(cv_hash):
+    return next(c for c in talentscope.requisition_candidates(talentscope.load_data()) if c.get("cv_hash") == cv_hash)
+
+
+def test_update_candidate_by_name(client, saved_ranking):
+    response = client.post('/update_candidate', json={"candidate_name": "Alice", "status": "Screened"})
+    assert response.status_code == 200
+    assert response.json == {"status": "success", "version": 1}
+    assert saved("a" * 64)["status"] == "Screened"
+
+
+def test_update_candidate_errors(client, saved_ranking):
+    assert client.post('/update_candidate', json={"status": "Screened"}).status_code == 400
+    assert client.post('/update_candidate', json={"cv_hash": "a" * 64, "version": "x"}).status_code == 400
+    assert client.post('/update_candidate', json={"candidate_name": "Carol", "status": "Screened"}).status_code == 404
+
+    response = client.post('/update_candidate', json={"cv_hash": "b" * 64, "notes": "stale", "version": 0})
+    assert response.status_code == 409
+    assert response.json["conflicts"][0]["current_version"] == 3
+
+
+def test_bulk_update_conflict_then_resend(client, saved_ranking):
+    # What flushMoves does: a stale batch is refused whole, then the
+    # non-conflicting moves are re-sent on their own
+    moves = [
+        {"cv_hash": "a" * 64, "status": "Screened", "version": 0},
+        {"cv_hash": "b" * 64, "status": "Rejected", "version": 2}
+    ]
+    response = client.post('/bulk_update_candidates', json={"updates": moves, "requisition_id": "req_1"})
+    assert response.status_code == 409
+    conflicted = [conflict["cv_hash"] for conflict in response.json["conflicts"]]
+    assert conflicted == ["b" * 64]
+    assert saved("a" * 64)["status"] == "Applied"
+
+    retry = [move for move in moves if move["cv_hash"] not in conflicted]
+    response = client.post('/bulk_update_candidates', json={"updates": retry, "requisition_id": "req_1"})
+    assert response.status_code == 200
+    assert response.json["updated"] == [{"cv_hash": "a" * 64, "candidate_name": "Alice", "version": 1, "status": "Screened"}]
+    assert saved("a" * 64)["status"] == "Screened"
+    assert saved("b" * 64)["status"] == "Applied"
+
+
+def test_bulk_update_requires_updates(client, saved_ranking):
+    assert client.post('/bulk_update_candidates', json={}).status_code == 400
+    assert client.post('/bulk_update_candidates', json={"updates": {"cv_hash": "a" * 64}}).status_code == 400
@@ -0,0 +1,114 @@
+import hashlib, os
+from datetime import datetime
+
+import pytest
+
+from catalogue import Catalogue, HEADER_SIZE, RECORD_SIZE
+
+
+def store(root, name, content):
+    path = os.path.join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path, hashlib.sha256(content).hexdigest()
+
+
+@pytest.fixture
+def catalogue(tmp_path):
+    root = tmp_path / "uploaded_cvs"
+    root.mkdir()
+    return Catalogue(str(tmp_path / "cv_catalogue.bin"), str(root))
+
+
+def test_empty_catalogue(catalogue):
+    assert not catalogue.exists()
+    assert list(catalogue.records()) == []
+    assert catalogue.count() == 0
+
+
+def test_records_round_trip(catalogue):
+    path, f_hash = store(catalogue.root, "ab/cd/cv.pdf", b"%PDF one")
+    outside, outside_hash = store(os.path.dirname(catalogue.root), "legacy.pdf", b"%PDF two")
+
+    catalogue.add(f_hash, path, 8, "email", ingested_at=1700000000.0)
+    catalogue.add(outside_hash, outside, 8, "fax")
+
+    assert os.path.getsize(catalogue.path) == HEADER_SIZE + 2 * RECORD_SIZE
+    first, second = catalogue.records()
+    assert first == {
+        "hash": f_hash,
+        "path": path,
+        "size": 8,
+        "source": "email",
+        "ingested_at": datetime.fromtimestamp(1700000000.0).isoformat()
+    }
+    # Paths outside the root are kept absolute; unknown sources fall back
+    assert second["path"] == outside
+    assert second["source"] == "unknown"
+    assert catalogue.count() == 2
+    assert catalogue.paths() == [path, outside]
+
+
+def test_path_too_long(catalogue):
+    with pytest.raises(ValueError):
+        catalogue.add("00" * 32, os.path.join(catalogue.root, "x" * 300 + ".pdf"), 1, "manual")
+
+
+def test_clear(catalogue):
+    path, f_hash = store(catalogue.root, "cv.pdf", b"%PDF")
+    catalogue.add(f_hash, path, 4, "manual")
+    catalogue.clear()
+    assert catalogue.exists()
+    assert catalogue.count() == 0
+
+
+def test_reconcile_reports_drift_without_repair(catalogue):
+    kept, kept_hash = store(catalogue.root, "ab/kept.pdf", b"%PDF kept")
+    gone, gone_hash = store(catalogue.root, "ab/gone.pdf", b"%PDF gone")
+    untracked, _ = store(catalogue.root, "cd/untracked.pdf", b"%PDF untracked")
+    catalogue.add(kept_hash, kept, 9, "manual")
+    catalogue.add(gone_hash, gone, 9, "manual")
+    os.remove(gone)
+
+    report = catalogue.reconcile()
+
+    assert report["missing"] == [gone]
+    assert report["untracked"] == [untracked]
+    assert report["catalogued"] == 2
+    assert report["on_disk"] == 2
+    assert catalogue.count() == 2
+
+
+def test_reconcile_repair_round_trip(catalogue):
+    kept, kept_hash = store(catalogue.root, "ab/kept.pdf", b"%PDF kept")
+    gone, gone_hash = store(catalogue.root, "ab/gone.pdf", b"%PDF gone")
+    known, known_hash = store(catalogue.root, "cd/known.pdf", b"%PDF known")
+    stray, stray_hash = store(catalogue.root, "stray.PDF", b"%PDF stray")
+    store(catalogue.root, "notes.txt", b"not a CV")
+    catalogue.add(kept_hash, kept, 9, "email", ingested_at=1700000000.0)
+    catalogue.add(gone_hash, gone, 9, "manual")
+    os.remove(gone)
+
+    metadata = {known: {"hash": known_hash, "source": "email", "upload_date": "2024-01-02T03:04:05"}}
+    catalogue.reconcile(repair=True, metadata=metadata)
+
+    by_path = {record["path"]: record for record in catalogue.records()}
+    assert set(by_path) == {kept, known, stray}
+    assert by_path[kept]["source"] == "email"
+    assert by_path[kept]["ingested_at"] == datetime.fromtimestamp(1700000000.0).isoformat()
+    assert by_path[known]["ingested_at"] == "2024-01-02T03:04:05"
+    assert by_path[known]["source"] == "email"
+    # Files without metadata are hashed from disk
+    assert by_path[stray]["hash"] == stray_hash
+    assert by_path[stray]["source"] == "unknown"
+
+    report = catalogue.reconcile()
+    assert report["missing"] == [] and report["untracked"] == []
+
+
+def test_reconcile_repair_builds_missing_catalogue(catalogue):
+    path, f_hash = store(catalogue.root, "cv.pdf", b"%PDF")
+    catalogue.reconcile(repair=True)
+    assert catalogue.exists()
+    assert [record["hash"] for record in catalogue.records()] == [f_hash]
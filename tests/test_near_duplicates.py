@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+from near_duplicates import (
+    PersonIndex, NUM_PERM, SIMILARITY_THRESHOLD, EMAIL_SIMILARITY_THRESHOLD,
+    extract_email, shingles, minhash, similarity
+)
+
+_rng = random.Random(7)
+VOCABULARY = [f"word{i}" for i in range(5000)]
+BASE = _rng.sample(VOCABULARY, 200)
+
+
+def cv(edits=(), email=None, words=BASE):
+    """The base CV with the words at the given positions replaced"""
+    words = list(words)
+    for position in edits:
+        words[position] = f"edit{position}"
+    return (f"Contact: {email}\n" if email else "") + " ".join(words)
+
+
+def unrelated(seed, email=None):
+    return cv(email=email, words=random.Random(seed).sample(VOCABULARY, 200))
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PersonIndex(str(tmp_path / "cv_people.jsonl"))
+
+
+def test_extract_email_takes_the_first_address():
+    assert extract_email("Jo Bloggs\nJo.Bloggs@Example.co.uk. Referee: ref@example.com") == "jo.bloggs@example.co.uk"
+    assert extract_email("no contact details") is None
+    assert extract_email(None) is None
+
+
+def test_shingles_of_short_text():
+    assert shingles("Staff Nurse") == {"staff nurse"}
+    assert shingles("") == set()
+    assert len(shingles("a b c d e f")) == 2
+
+
+def test_signatures_estimate_similarity():
+    assert minhash(cv()) == minhash(cv())
+    assert len(minhash(cv())) == NUM_PERM
+    assert similarity(minhash(cv()), minhash(cv(edits=[100]))) >= SIMILARITY_THRESHOLD
+    assert similarity(minhash(cv()), minhash(unrelated(1))) < 0.1
+    # Empty text gets a signature that matches nothing real
+    assert similarity(minhash(""), minhash(cv())) == 0
+
+
+def test_close_versions_share_a_person(index):
+    people = index.assign({"v1": cv(), "v2": cv(edits=[100]), "other": unrelated(1)})
+    assert people["v1"] == people["v2"] == "person_v1"
+    assert people["other"] == "person_other"
+
+
+def test_shared_email_alone_does_not_group(index):
+    people = index.assign({
+        "a": unrelated(1, email="cvs@agency.co.uk"),
+        "b": unrelated(2, email="cvs@agency.co.uk")
+    })
+    assert people["a"] != people["b"]
+
+
+def test_shared_email_groups_fairly_similar_versions(index):
+    sim = similarity(minhash(cv()), minhash(cv(edits=range(0, 200, 25))))
+    assert EMAIL_SIMILARITY_THRESHOLD <= sim < SIMILARITY_THRESHOLD
+
+    people = index.assign({"old": cv(email="jo@example.com"), "new": cv(edits=range(0, 200, 25), email="jo@example.com")})
+    assert people["old"] == people["new"]
+
+    other = PersonIndex(index.path + ".2").assign({"old": cv(), "new": cv(edits=range(0, 200, 25))})
+    assert other["old"] != other["new"]
+
+
+def test_close_match_merges_two_people(index):
+    # Each is a few edits from the base CV, but they are six edits apart
+    first = cv(edits=[20, 50, 80])
+    second = cv(edits=[120, 150, 180])
+    assert similarity(minhash(first), minhash(cv())) >= SIMILARITY_THRESHOLD
+    assert similarity(minhash(second), minhash(cv())) >= SIMILARITY_THRESHOLD
+    assert similarity(minhash(first), minhash(second)) < SIMILARITY_THRESHOLD
+
+    people = index.assign({"first": first, "second": second})
+    assert people["first"] != people["second"]
+
+    people = index.assign({"bridge": cv(), "first": None, "second": None})
+    assert people == {"bridge": "person_first", "first": "person_first", "second": "person_first"}
+    # The merge is in the log, so a fresh reader replays it
+    assert PersonIndex(index.path).assign({"second": None}) == {"second": "person_first"}
+
+
+def test_index_persists_and_follows_other_processes(index):
+    index.assign({"v1": cv()})
+    other = PersonIndex(index.path)
+    assert other.known() == {"v1"}
+
+    # Lines appended by one process are picked up by the other without a full reload
+    index.assign({"v2": cv(edits=[100]), "x": unrelated(3)})
+    assert other.known() == {"v1", "v2", "x"}
+    assert other.assign({"v2": None}) == {"v2": "person_v1"}
+
+    other.clear()
+    assert index.known() == set()
+    assert index.assign({"x": unrelated(3)}) == {"x": "person_x"}
+    assert PersonIndex(index.path).known() == {"x"}
+
+
+def test_torn_tail_is_ignored_and_overwritten(index):
+    index.assign({"v1": cv()})
+    with open(index.path, 'ab') as f:
+        f.write(b'{"hash": "half-writ')
+
+    reader = PersonIndex(index.path)
+    assert reader.known() == {"v1"}
+    reader.assign({"v2": cv(edits=[100])})
+
+    assert PersonIndex(index.path).assign({"v1": None, "v2": None}) == {"v1": "person_v1", "v2": "person_v1"}
+    with open(index.path, 'rb') as f:
+        assert b"half-writ" not in f.read()
+
+
+def test_known_hashes_are_not_rescored(index):
+    index.assign({"v1": cv()})
+    # A known hash keeps its entry whatever text comes with it
+    assert index.assign({"v1": unrelated(4)}) == {"v1": "person_v1"}
+    assert index.assign({"missing": None}) == {}
@@ -0,0 +1,135 @@
+import pytest
+
+from prescreen import prescreen, rejection_reason, hints, jd_excludes_sponsorship, compact_text, PRESCREEN_VERSION
+
+NO_SPONSORSHIP_JD = "Staff Nurse. Please note we are unable to offer sponsorship for this role."
+
+
+@pytest.mark.parametrize("text", [
+    "I require visa sponsorship",
+    "I will require sponsorship to take up this post",
+    "I'll need sponsorship",
+    "I’d need sponsorship",
+    "I am seeking sponsorship from a UK employer",
+    "Nationality: Indian. I currently require a Skilled Worker visa.",
+    "I need sponsorship. No DBS yet."
+])
+def test_first_person_sponsorship_need_is_rejected(text):
+    fields = prescreen(text)
+    assert fields["rtw"] == "needs_sponsorship"
+    assert rejection_reason(fields, NO_SPONSORSHIP_JD).startswith("Requires visa sponsorship")
+
+
+@pytest.mark.parametrize("text", [
+    # Negated before the phrase
+    "I do not need sponsorship",
+    "I don't require sponsorship",
+    "I don’t require sponsorship",
+    "I will not require visa sponsorship",
+    "I no longer need sponsorship",
+    "I would never need sponsorship",
+    # Answered after the phrase
+    "Visa sponsorship required: No",
+    "Require sponsorship? No",
+    "Right to work: UK. Sponsorship required - no.",
+    "Sponsorship required – N/A",
+    "Sponsorship required: n/a",
+    "Requires sponsorship (not applicable)",
+    "I require sponsorship: no",
+    # Past visas
+    "Previously held Tier 2 sponsorship"
+])
+def test_negated_or_answered_sponsorship_is_not_a_need(text):
+    fields = prescreen(text)
+    assert fields["rtw"] != "needs_sponsorship"
+    assert rejection_reason(fields, NO_SPONSORSHIP_JD) is None
+
+
+@pytest.mark.parametrize("text", [
+    "Sponsorship required: Yes",
+    "Visa sponsorship required",
+    "Candidate requires sponsorship",
+    "Seeking visa sponsorship"
+])
+def test_bare_sponsorship_phrases_go_to_the_llm(text):
+    fields = prescreen(text)
+    assert fields["rtw"] == "needs_sponsorship"
+    assert rejection_reason(fields, NO_SPONSORSHIP_JD) is None
+    assert hints(fields)["rtw"] == "needs_sponsorship"
+
+
+def test_any_negated_phrase_blocks_the_rejection():
+    fields = prescreen("Require sponsorship? No.\nNationality: Indian, and I require visa sponsorship for my spouse.")
+    assert fields["rtw"] == "needs_sponsorship"
+    assert fields["rtw_negated"] == ["require sponsorship"]
+    assert rejection_reason(fields, NO_SPONSORSHIP_JD) is None
+
+
+def test_right_to_work_evidence_wins():
+    fields = prescreen("British citizen. I require sponsorship for my partner's visa.")
+    assert fields["rtw"] == "yes"
+    assert fields["rtw_evidence"] == "british citizen"
+    assert rejection_reason(fields, NO_SPONSORSHIP_JD) is None
+
+
+def test_negated_right_to_work_is_not_evidence():
+    assert prescreen("I do not have the right to work in the UK")["rtw"] == "unknown"
+    assert prescreen("Not a UK citizen, but I hold ILR")["rtw"] == "yes"
+
+
+def test_no_sponsorship_required_is_not_read_as_sponsorship_required():
+    fields = prescreen("Full UK driving licence. No sponsorship required.")
+    assert fields["rtw"] == "yes"
+    assert fields["rtw_evidence"] == "no sponsorship required"
+
+
+def test_time_limited_visa():
+    assert prescreen("Currently on a Graduate visa until 2026")["rtw"] == "time_limited"
+
+
+def test_jd_must_exclude_sponsorship_to_reject():
+    fields = prescreen("I require visa sponsorship")
+    assert rejection_reason(fields, "Staff Nurse. Sponsorship available for the right candidate.") is None
+    assert jd_excludes_sponsorship("We CANNOT  sponsor visas")
+    assert not jd_excludes_sponsorship("")
+
+
+def test_registrations_dbs_and_email():
+    fields = prescreen(
+        "Dr Jo Bloggs, jo.bloggs@example.com\n"
+        "GMC number: 1234567\nNMC PIN 12A3456B\n"
+        "Enhanced DBS on the update service"
+    )
+    assert fields == {
+        "version": PRESCREEN_VERSION,
+        "rtw": "unknown",
+        "rtw_evidence": None,
+        "rtw_negated": [],
+        "sponsorship_stated": False,
+        "gmc_number": "1234567",
+        "nmc_pin": "12A3456B",
+        "dbs": "enhanced",
+        "dbs_update_service": True,
+        "email": "jo.bloggs@example.com"
+    }
+    assert hints(fields) == {
+        "gmc_number": "1234567",
+        "nmc_pin": "12A3456B",
+        "dbs": "enhanced",
+        "dbs_update_service": True,
+        "email": "jo.bloggs@example.com"
+    }
+
+
+def test_dbs_mentioned_without_level():
+    assert prescreen("DBS checked 2023")["dbs"] == "mentioned"
+    assert prescreen("Nursing since 2015")["dbs"] is None
+
+
+def test_gmc_number_needs_seven_digits():
+    assert prescreen("GMC 123456")["gmc_number"] is None
+
+
+def test_compact_text():
+    assert compact_text("a   b\t c\n\n\n  \nd") == "a b c\nd"
+    assert compact_text(None) == ""